@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import io
+import time
+from concurrent.futures import Executor, Future
+
+from benchmarks.common import prepare_environment, create_user, report
+
+prepare_environment()
+
+import httpx  # noqa: E402
+from PIL import Image  # noqa: E402
+
+from contacts_api import auth  # noqa: E402
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.models import Contact  # noqa: E402
+
+
+class InlineExecutor(Executor):
+    # Runs the job on the calling (event loop) thread, like the old upload path did.
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+def sample_image() -> bytes:
+    image = Image.effect_noise((2400, 1800), 64).convert("RGB")
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+async def upload_loop(client, headers: dict, image: bytes, stop: asyncio.Event, counts: dict):
+    while not stop.is_set():
+        response = await client.post("/auth/upload-avatar", files={"file": ("a.jpg", image, "image/jpeg")}, headers=headers)
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+
+
+async def run(label: str, url: str, headers: dict, image: bytes, uploaders: int, probes: int):
+    counts = {}
+    stop = asyncio.Event()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        tasks = [asyncio.create_task(upload_loop(client, headers, image, stop, counts)) for _ in range(uploaders)]
+        await asyncio.sleep(0.1)
+        timings = []
+        for _ in range(probes):
+            start = time.perf_counter()
+            (await client.get(url, headers=headers)).raise_for_status()
+            timings.append(time.perf_counter() - start)
+            await asyncio.sleep(0.01)
+        stop.set()
+        await asyncio.gather(*tasks)
+    report(label, timings)
+    print(f"{'':<32} upload responses: {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of GET /contacts/{id} during concurrent avatar uploads")
+    parser.add_argument("--uploaders", type=int, default=8)
+    parser.add_argument("--probes", type=int, default=100)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user, headers = create_user(db, "avatar-bench@example.com")
+    contact = Contact(first_name="Grace", last_name="Hopper", email="grace@example.com", phone="1", user_id=user.id)
+    db.add(contact)
+    db.commit()
+    url = f"/contacts/{contact.id}"
+    db.close()
+    image = sample_image()
+    print(f"sample image: {len(image)} bytes")
+
+    pool = auth.thumbnail_executor
+    auth.thumbnail_executor = InlineExecutor()
+    asyncio.run(run("thumbnails on the event loop", url, headers, image, args.uploaders, args.probes))
+    auth.thumbnail_executor = pool
+    asyncio.run(run("thumbnails in worker pool", url, headers, image, args.uploaders, args.probes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import prepare_environment, create_user, timed_requests, report
+
+prepare_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.models import Contact, birthday_ordinal  # noqa: E402
+
+SEED_BATCH = 10000
+
+# Same window computed with strftime on every row: correct, but can't use an index.
+SCAN_QUERY = text(
+    "SELECT id FROM contacts WHERE user_id = :user_id AND birthday IS NOT NULL "
+    "AND ((julianday(strftime('%Y', 'now') || strftime('-%m-%d', birthday)) - julianday('now', 'start of day') + 366) % 366) "
+    "<= :days"
+)
+INDEXED_QUERY = text(
+    "SELECT id FROM contacts WHERE user_id = :user_id AND "
+    "(birthday_ordinal BETWEEN :start AND :end OR (:start > :end AND (birthday_ordinal >= :start OR birthday_ordinal <= :end))) "
+    "ORDER BY (birthday_ordinal - :start + 366) % 366"
+)
+
+
+def time_query(db, query, params: dict, count: int):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        db.execute(query, params).all()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def seed(db, user_ids, per_user: int):
+    rng = random.Random(per_user)
+    rows = []
+    for user_id in user_ids:
+        for i in range(per_user):
+            birthday = date(1950, 1, 1) + timedelta(days=rng.randrange(365 * 50))
+            rows.append({
+                "first_name": f"F{i}", "last_name": "L", "email": f"u{user_id}-{i}@example.com", "phone": "1",
+                "birthday": birthday, "birthday_ordinal": birthday_ordinal(birthday), "user_id": user_id,
+            })
+            if len(rows) == SEED_BATCH:
+                db.execute(insert(Contact), rows)
+                rows = []
+    if rows:
+        db.execute(insert(Contact), rows)
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Upcoming birthdays via the indexed ordinal column vs a date scan")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--contacts", type=int, default=10000, help="contacts per user")
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    sessions = [create_user(db, f"bday-bench-{i}@example.com") for i in range(args.users)]
+    start = time.perf_counter()
+    seed(db, [user.id for user, _ in sessions], args.contacts)
+    print(f"seeded {args.users * args.contacts} contacts in {time.perf_counter() - start:.1f}s")
+
+    user, headers = sessions[0]
+    client = TestClient(app)
+    today = date.today()
+    for days in (7, 30):
+        window = {"user_id": user.id, "start": birthday_ordinal(today), "end": birthday_ordinal(today + timedelta(days=days))}
+        report(f"ordinal index days={days} (sql)", time_query(db, INDEXED_QUERY, window, args.requests))
+        report(f"strftime scan days={days} (sql)",
+               time_query(db, SCAN_QUERY, {"user_id": user.id, "days": days}, args.requests))
+        report(f"endpoint days={days}", timed_requests(
+            client, "GET", "/contacts/upcoming-birthdays/", args.requests, params={"days": days}, headers=headers))
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
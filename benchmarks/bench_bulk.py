@@ -0,0 +1,77 @@
+import argparse
+import csv
+import io
+import json
+import time
+
+from benchmarks.common import prepare_environment, create_user
+
+prepare_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+
+FIELDS = ["first_name", "last_name", "email", "phone", "birthday", "additional_info"]
+
+
+def make_rows(prefix: str, count: int):
+    for i in range(count):
+        yield {
+            "first_name": f"First{i}", "last_name": f"Last{i % 1000}", "email": f"{prefix}{i}@example.com",
+            "phone": f"+380{i:09d}", "birthday": f"19{50 + i % 50}-{1 + i % 12:02d}-{1 + i % 28:02d}",
+            "additional_info": None if i % 3 else "imported",
+        }
+
+
+def as_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode()
+
+
+def as_ndjson(rows) -> bytes:
+    return "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk import/export throughput vs one POST /contacts/ per row")
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--single-rows", type=int, default=500)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    _, headers = create_user(db, "bulk-bench@example.com")
+    db.close()
+    client = TestClient(app)
+
+    start = time.perf_counter()
+    for row in make_rows("single", args.single_rows):
+        client.post("/contacts/", json=row, headers=headers).raise_for_status()
+    elapsed = time.perf_counter() - start
+    print(f"{'POST /contacts/ per row':<28} {args.single_rows:>7} rows  {args.single_rows / elapsed:10.1f} rows/s")
+
+    for fmt, encode, media_type in (("csv", as_csv, "text/csv"), ("ndjson", as_ndjson, "application/x-ndjson")):
+        payload = encode(make_rows(fmt, args.rows))
+        start = time.perf_counter()
+        response = client.post("/contacts/bulk", files={"file": (f"contacts.{fmt}", payload, media_type)}, headers=headers)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        result = response.json()
+        print(f"{'bulk import ' + fmt:<28} {result['inserted']:>7} rows  {result['inserted'] / elapsed:10.1f} rows/s"
+              f"  ({result['failed']} failed)")
+
+    for fmt in ("csv", "ndjson"):
+        start = time.perf_counter()
+        response = client.get("/contacts/export", params={"format": fmt}, headers=headers)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        rows = response.text.count("\n") - (1 if fmt == "csv" else 0)
+        print(f"{'export ' + fmt:<28} {rows:>7} rows  {rows / elapsed:10.1f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import argparse
+import asyncio
+import random
+import time
+
+from benchmarks.common import prepare_environment, create_user, percentile
+
+prepare_environment()
+
+import httpx  # noqa: E402
+
+from contacts_api import database  # noqa: E402
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.models import Contact  # noqa: E402
+
+
+def seed(clients: int, contacts_per_user: int):
+    db = SessionLocal()
+    sessions = []
+    for i in range(clients):
+        user, headers = create_user(db, f"db-bench-{i}@example.com")
+        db.add_all(
+            Contact(first_name=f"First{j}", last_name=f"Last{j}", email=f"c-{i}-{j}@example.com", phone="1", user_id=user.id)
+            for j in range(contacts_per_user)
+        )
+        db.commit()
+        ids = [c.id for c in db.query(Contact.id).filter(Contact.user_id == user.id)]
+        sessions.append((headers, ids))
+    db.close()
+    return sessions
+
+
+async def client_loop(client, worker: int, headers: dict, ids: list, write_ratio: float, deadline: float, timings: list):
+    n = 0
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        if random.random() < write_ratio:
+            if n % 2:
+                payload = {"first_name": "New", "last_name": "Contact", "email": f"new-{worker}-{n}-{time.monotonic_ns()}@example.com",
+                           "phone": "2", "birthday": None, "additional_info": None}
+                response = await client.post("/contacts/", json=payload, headers=headers)
+            else:
+                payload = {"first_name": "Upd", "last_name": "Contact", "email": f"upd-{worker}-{n}-{time.monotonic_ns()}@example.com",
+                           "phone": "3", "birthday": None, "additional_info": None}
+                response = await client.put(f"/contacts/{random.choice(ids)}", json=payload, headers=headers)
+        elif n % 4:
+            response = await client.get(f"/contacts/{random.choice(ids)}", headers=headers)
+        else:
+            response = await client.get("/contacts/?limit=20", headers=headers)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        n += 1
+
+
+async def run(label: str, sessions, duration: float, write_ratio: float):
+    timings = []
+    deadline = time.monotonic() + duration
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        await asyncio.gather(*(
+            client_loop(client, i, headers, ids, write_ratio, deadline, timings)
+            for i, (headers, ids) in enumerate(sessions)
+        ))
+    print(
+        f"{label:<12} {len(sessions)} clients  {len(timings) / duration:9.1f} req/s  "
+        f"p50 {percentile(timings, 50) * 1000:7.2f} ms  p99 {percentile(timings, 99) * 1000:7.2f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed read/write throughput against SQLite, async vs sync sessions")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--contacts", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    sessions = seed(args.clients, args.contacts)
+    for label, use_async in (("sync", False), ("async", True)):
+        database.DB_ASYNC = use_async
+        asyncio.run(run(label, sessions, args.duration, args.write_ratio))
+
+
+if __name__ == "__main__":
+    main()
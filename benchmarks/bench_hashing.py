@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import prepare_environment, create_user, report
+
+prepare_environment()
+
+import httpx  # noqa: E402
+
+from contacts_api import auth  # noqa: E402
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.models import Contact  # noqa: E402
+from contacts_api.utils import HashingService  # noqa: E402
+
+
+async def register_loop(client, worker: int, stop: asyncio.Event, counts: dict):
+    n = 0
+    while not stop.is_set():
+        payload = {"email": f"reg-{worker}-{n}-{time.monotonic_ns()}@example.com", "password": "secret123"}
+        response = await client.post("/auth/register", json=payload)
+        counts[response.status_code] = counts.get(response.status_code, 0) + 1
+        n += 1
+
+
+async def probe(client, url: str, headers: dict, count: int):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = await client.get(url, headers=headers)
+        timings.append(time.perf_counter() - start)
+        response.raise_for_status()
+        await asyncio.sleep(0.005)
+    return timings
+
+
+async def run(label: str, url: str, headers: dict, registrars: int, probes: int):
+    counts = {}
+    stop = asyncio.Event()
+    # With bcrypt on the event loop, write transactions stall past SQLite's busy timeout; count those as 500s
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        tasks = [asyncio.create_task(register_loop(client, i, stop, counts)) for i in range(registrars)]
+        await asyncio.sleep(0.1)
+        timings = await probe(client, url, headers, probes)
+        stop.set()
+        await asyncio.gather(*tasks)
+    report(label, timings)
+    print(f"{'':<32} registration responses: {counts}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of GET /contacts/{id} while registrations run concurrently")
+    parser.add_argument("--registrars", type=int, default=8)
+    parser.add_argument("--probes", type=int, default=50)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user, headers = create_user(db, "hash-bench@example.com")
+    contact = Contact(first_name="Alan", last_name="Turing", email="alan@example.com", phone="1", user_id=user.id)
+    db.add(contact)
+    db.commit()
+    url = f"/contacts/{contact.id}"
+    db.close()
+
+    auth.hashing_service = HashingService(workers=0)
+    asyncio.run(run("hashing on the event loop", url, headers, args.registrars, args.probes))
+
+    auth.hashing_service = HashingService()
+    asyncio.run(run("hashing in worker pool", url, headers, args.registrars, args.probes))
+    print("pool stats:", auth.hashing_service.stats())
+    auth.hashing_service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
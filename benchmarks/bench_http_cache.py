@@ -0,0 +1,49 @@
+import argparse
+
+from benchmarks.common import prepare_environment, create_user, timed_requests, report
+
+prepare_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert  # noqa: E402
+
+from contacts_api import http_cache  # noqa: E402
+from contacts_api.cache import ResponseCache  # noqa: E402
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.models import Contact  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Polling GET /contacts/ with no cache, server cache and If-None-Match")
+    parser.add_argument("--contacts", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user, headers = create_user(db, "etag-bench@example.com")
+    db.execute(insert(Contact), [
+        {"first_name": f"F{i}", "last_name": "L", "email": f"etag{i}@example.com", "phone": "1", "user_id": user.id}
+        for i in range(args.contacts)
+    ])
+    db.commit()
+    db.close()
+
+    client = TestClient(app)
+    url = f"/contacts/?limit={args.limit}"
+
+    http_cache.response_cache = ResponseCache(max_entries=0)
+    report("no server cache", timed_requests(client, "GET", url, args.requests, headers=headers))
+
+    http_cache.response_cache = ResponseCache()
+    report("server response cache", timed_requests(client, "GET", url, args.requests, headers=headers))
+
+    etag = client.get(url, headers=headers).headers["etag"]
+    conditional = {**headers, "If-None-Match": etag}
+    report("If-None-Match -> 304", timed_requests(client, "GET", url, args.requests, headers=conditional))
+    print("cache stats:", http_cache.response_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import prepare_environment, create_user, timed_requests, report
+
+prepare_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from contacts_api import metrics  # noqa: E402
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.middleware import MetricsMiddleware  # noqa: E402
+from contacts_api.models import Contact  # noqa: E402
+
+
+async def bare_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def time_asgi(asgi_app, count: int) -> float:
+    # Calls the ASGI app directly, without a client, so only the middleware's own cost is measured.
+    scope = {"type": "http", "method": "GET", "path": "/bench", "headers": []}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await asgi_app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Overhead of the metrics middleware and the sampling profiler")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--asgi-calls", type=int, default=100000)
+    args = parser.parse_args()
+
+    metrics.profiler.sample_rate = 0.0
+    metrics.METRICS_ENABLED = False
+    disabled = asyncio.run(time_asgi(MetricsMiddleware(bare_app), args.asgi_calls))
+    bare = asyncio.run(time_asgi(bare_app, args.asgi_calls))
+    metrics.METRICS_ENABLED = True
+    enabled = asyncio.run(time_asgi(MetricsMiddleware(bare_app), args.asgi_calls))
+    print(f"middleware cost per request: disabled {(disabled - bare) * 1e6:.2f} us, enabled {(enabled - bare) * 1e6:.2f} us")
+
+    db = SessionLocal()
+    user, headers = create_user(db, "metrics-bench@example.com")
+    contact = Contact(first_name="Edsger", last_name="Dijkstra", email="edsger@example.com", phone="1", user_id=user.id)
+    db.add(contact)
+    db.commit()
+    url = f"/contacts/{contact.id}"
+    db.close()
+
+    client = TestClient(app)
+    timed_requests(client, "GET", url, 100, headers=headers)
+
+    runs = [
+        ("metrics disabled", False, 0.0),
+        ("metrics enabled", True, 0.0),
+        ("metrics + profiler 1%", True, 0.01),
+        ("metrics + profiler 100%", True, 1.0),
+    ]
+    results = {}
+    for label, enabled, sample_rate in runs:
+        metrics.METRICS_ENABLED = enabled
+        metrics.profiler.sample_rate = sample_rate
+        timings = timed_requests(client, "GET", url, args.requests, headers=headers)
+        results[label] = sum(timings) / len(timings)
+        report(label, timings)
+
+    baseline = results["metrics disabled"]
+    for label, mean in results.items():
+        print(f"{label:<32} mean {mean * 1e6:8.1f} us  overhead {(mean - baseline) * 1e6:+8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from benchmarks.common import free_port, prepare_environment
+
+SMTP_PORT = free_port()
+os.environ.update({
+    "MAIL_SERVER": "127.0.0.1",
+    "MAIL_PORT": str(SMTP_PORT),
+    "MAIL_STARTTLS": "False",
+    "MAIL_SSL_TLS": "False",
+    "MAIL_USE_CREDENTIALS": "False",
+    "OUTBOX_ENABLED": "False",
+})
+prepare_environment()
+
+from aiosmtpd.controller import Controller  # noqa: E402
+
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.email_utils import send_email  # noqa: E402
+from contacts_api.main import app  # noqa: E402,F401  (creates the tables)
+from contacts_api.outbox import EmailDispatcher, enqueue_email  # noqa: E402
+
+
+class CountingHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def enqueue(count: int):
+    db = SessionLocal()
+    for i in range(count):
+        enqueue_email(db, "Benchmark", f"user{i}@example.com", "<p>hello</p>")
+    db.commit()
+    db.close()
+
+
+async def send_inline(count: int) -> None:
+    await asyncio.gather(*(send_email("Benchmark", f"user{i}@example.com", "<p>hello</p>") for i in range(count)))
+
+
+async def drain(dispatcher: EmailDispatcher) -> None:
+    while await dispatcher.dispatch_once():
+        pass
+    await dispatcher.stop()
+    await dispatcher.refresh_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Outbox dispatcher throughput against a local aiosmtpd server")
+    parser.add_argument("--messages", type=int, default=500)
+    args = parser.parse_args()
+
+    for name in ("mail.log", "contacts_api.email_utils", "contacts_api.outbox"):
+        logging.getLogger(name).setLevel(logging.ERROR)
+    handler = CountingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=SMTP_PORT)
+    controller.start()
+    try:
+        start = time.perf_counter()
+        asyncio.run(send_inline(args.messages // 5))
+        elapsed = time.perf_counter() - start
+        print(f"{'inline send_email (new connection each)':<44} {args.messages // 5 / elapsed:9.1f} msg/s")
+
+        enqueue(args.messages)
+        dispatcher = EmailDispatcher()
+        start = time.perf_counter()
+        asyncio.run(drain(dispatcher))
+        elapsed = time.perf_counter() - start
+        print(f"{'outbox dispatcher (batched, reused connection)':<44} {args.messages / elapsed:9.1f} msg/s")
+        print("dispatcher stats:", dispatcher.stats(), "server received:", handler.received)
+
+        controller.stop()
+        enqueue(10)
+        dispatcher = EmailDispatcher()
+        asyncio.run(drain(dispatcher))
+        print("with SMTP down:", dispatcher.stats())
+    finally:
+        if controller.loop.is_running():
+            controller.stop()
+
+
+if __name__ == "__main__":
+    main()
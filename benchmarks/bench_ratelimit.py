@@ -0,0 +1,106 @@
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import prepare_environment, report
+
+os.environ["RATE_LIMIT_ENABLED"] = "true"
+prepare_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from contacts_api import ratelimit  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.middleware import RateLimitMiddleware  # noqa: E402
+from contacts_api.ratelimit import (  # noqa: E402
+    BucketPolicy,
+    LocalSharedStore,
+    MemoryRateLimitBackend,
+    RateLimiter,
+    SharedRateLimitBackend,
+)
+
+UNLIMITED = BucketPolicy("unlimited", 1e9, 10**9)
+STRICT = BucketPolicy("strict", 0.001, 1)
+
+
+async def bare_app(scope, receive, send):
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def time_consume(backend, policy: BucketPolicy, keys: int, count: int) -> float:
+    start = time.perf_counter()
+    for i in range(count):
+        await backend.consume(f"bench:{i % keys}", policy)
+    return (time.perf_counter() - start) / count
+
+
+async def time_asgi(asgi_app, count: int) -> float:
+    # Calls the ASGI app directly, so only the middleware's own cost is measured.
+    body = json.dumps({"email": "victim@example.com", "password": "guess"}).encode()
+    scope = {"type": "http", "method": "POST", "path": "/auth/login", "headers": [], "client": ("10.0.0.1", 1234)}
+
+    async def receive():
+        return {"type": "http.request", "body": body}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await asgi_app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cost of the login rate limiter per request")
+    parser.add_argument("--ops", type=int, default=200000)
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--attempts", type=int, default=200)
+    args = parser.parse_args()
+
+    backends = [
+        ("memory, 16 shards", MemoryRateLimitBackend()),
+        ("memory, 1 shard", MemoryRateLimitBackend(shards=1)),
+        ("shared (local store)", SharedRateLimitBackend(LocalSharedStore())),
+    ]
+    for label, backend in backends:
+        hot = asyncio.run(time_consume(backend, UNLIMITED, 1, args.ops))
+        spread = asyncio.run(time_consume(backend, UNLIMITED, args.keys, args.ops))
+        print(f"consume {label:<22} one key {hot * 1e6:6.2f} us  {args.keys} keys {spread * 1e6:6.2f} us")
+
+    # Distinct keys that expire right away must not pile up
+    backend = MemoryRateLimitBackend()
+    expiring = BucketPolicy("expiring", 1e6, 1)
+    asyncio.run(time_consume(backend, expiring, args.ops, args.ops))
+    print(f"buckets left after {args.ops} one-off keys: {len(backend)}")
+
+    bare = asyncio.run(time_asgi(bare_app, args.ops // 10))
+    allowed = RateLimitMiddleware(bare_app, RateLimiter(MemoryRateLimitBackend(), UNLIMITED, UNLIMITED), {"/auth/login"})
+    rejected = RateLimitMiddleware(bare_app, RateLimiter(MemoryRateLimitBackend(), STRICT, STRICT), {"/auth/login"})
+    allowed_cost = asyncio.run(time_asgi(allowed, args.ops // 10))
+    rejected_cost = asyncio.run(time_asgi(rejected, args.ops // 10))
+    print(f"middleware cost per request: allowed {(allowed_cost - bare) * 1e6:.2f} us, rejected {(rejected_cost - bare) * 1e6:.2f} us")
+
+    # Brute force against one account through the full app: only the first burst should reach bcrypt.
+    ratelimit.rate_limiter.backend = MemoryRateLimitBackend()
+    client = TestClient(app)
+    client.post("/auth/register", json={"email": "victim@example.com", "password": "correct-horse"})
+    statuses = {}
+    timings = {}
+    for i in range(args.attempts):
+        start = time.perf_counter()
+        response = client.post("/auth/login", json={"email": "victim@example.com", "password": f"guess-{i}"})
+        timings.setdefault(response.status_code, []).append(time.perf_counter() - start)
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+    print(f"login attempts by status: {statuses}")
+    for status, values in sorted(timings.items()):
+        report(f"login -> {status}", values)
+
+
+if __name__ == "__main__":
+    main()
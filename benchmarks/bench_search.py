@@ -0,0 +1,80 @@
+import argparse
+import random
+import time
+
+from benchmarks.common import prepare_environment, create_user, timed_requests, report
+
+prepare_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import delete, insert  # noqa: E402
+
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.models import Contact  # noqa: E402
+
+FIRST_NAMES = ["Anna", "Boris", "Chloe", "Dmytro", "Elena", "Farid", "Greta", "Hiro", "Ivan", "Julia", "Karim", "Lena"]
+LAST_NAMES = ["Smith", "Kovalenko", "Garcia", "Schmidt", "Tanaka", "Novak", "Rossi", "Ivanova", "Dubois", "Moreau"]
+SEED_BATCH = 10000
+
+
+def seed(db, tenants, size: int, small_user_id: int, small_size: int):
+    # size contacts split across the tenants, plus one small tenant sharing the same index
+    db.execute(delete(Contact))
+    rng = random.Random(size)
+    owners = [(tenants[i % len(tenants)], i) for i in range(size)]
+    owners += [(small_user_id, size + i) for i in range(small_size)]
+    for offset in range(0, len(owners), SEED_BATCH):
+        rows = [
+            {
+                "first_name": rng.choice(FIRST_NAMES) + str(i % 97),
+                "last_name": rng.choice(LAST_NAMES),
+                "email": f"contact{i}@example{i % 50}.com",
+                "phone": "1",
+                "user_id": user_id,
+            }
+            for user_id, i in owners[offset:offset + SEED_BATCH]
+        ]
+        db.execute(insert(Contact), rows)
+    db.commit()
+
+
+def run_queries(client, label: str, headers: dict, count: int):
+    report(f"{label} fts q=Kova", timed_requests(client, "GET", "/contacts/search/", count,
+                                                 params={"q": "Kova"}, headers=headers))
+    report(f"{label} ilike last_name=Kova", timed_requests(client, "GET", "/contacts/search/", count,
+                                                           params={"last_name": "Kova"}, headers=headers))
+    report(f"{label} fts q=greta 42", timed_requests(client, "GET", "/contacts/search/", count,
+                                                     params={"q": "greta 42"}, headers=headers))
+    report(f"{label} ilike first_name=Greta42", timed_requests(client, "GET", "/contacts/search/", count,
+                                                               params={"first_name": "Greta42"}, headers=headers))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FTS5 search (q=) vs ILIKE substring search")
+    parser.add_argument("--sizes", default="10000,100000", help="comma separated contact counts, e.g. 10000,100000,1000000")
+    parser.add_argument("--tenants", type=int, default=4, help="users the contacts are spread across")
+    parser.add_argument("--small-tenant", type=int, default=10, help="contacts owned by one extra, small user")
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    tenants = []
+    for i in range(args.tenants):
+        user, headers = create_user(db, f"search-bench-{i}@example.com")
+        tenants.append((user.id, headers))
+    small_user, small_headers = create_user(db, "search-bench-small@example.com")
+    client = TestClient(app)
+
+    for size in (int(s) for s in args.sizes.split(",")):
+        start = time.perf_counter()
+        seed(db, [user_id for user_id, _ in tenants], size, small_user.id, args.small_tenant)
+        print(f"--- {size} contacts over {args.tenants} users + {args.small_tenant} for a small user "
+              f"(seeded in {time.perf_counter() - start:.1f}s)")
+        run_queries(client, "large", tenants[0][1], args.requests)
+        run_queries(client, "small", small_headers, args.requests)
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
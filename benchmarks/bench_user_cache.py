@@ -0,0 +1,41 @@
+import argparse
+
+from benchmarks.common import prepare_environment, create_user, timed_requests, report
+
+prepare_environment()
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from contacts_api import auth  # noqa: E402
+from contacts_api.cache import TTLCache  # noqa: E402
+from contacts_api.database import SessionLocal  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.models import Contact  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GET /contacts/{id} throughput with and without the user cache")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    user, headers = create_user(db, "cache-bench@example.com")
+    contact = Contact(first_name="Ada", last_name="Lovelace", email="ada@example.com", phone="1", user_id=user.id)
+    db.add(contact)
+    db.commit()
+    url = f"/contacts/{contact.id}"
+    db.close()
+
+    client = TestClient(app)
+    client.get(url, headers=headers).raise_for_status()
+
+    auth.user_cache = TTLCache(maxsize=0)
+    report("user cache disabled", timed_requests(client, "GET", url, args.requests, headers=headers))
+
+    auth.user_cache = TTLCache(maxsize=auth.USER_CACHE_SIZE, ttl=auth.USER_CACHE_TTL)
+    report("user cache enabled", timed_requests(client, "GET", url, args.requests, headers=headers))
+    print("cache stats:", auth.user_cache.stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import logging
+import os
+import socket
+import tempfile
+import time
+
+BENCH_ENV = {
+    "SECRET_KEY": "benchmark-secret",
+    "AVATAR_STORAGE": "local",
+    # Every benchmark client comes from one address; bench_ratelimit turns it back on.
+    "RATE_LIMIT_ENABLED": "false",
+    # Benchmarks repeat the same URLs, which would only measure cache hits; bench_http_cache installs its own.
+    "RESPONSE_CACHE_ENABLED": "false",
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_environment() -> str:
+    # Must run before contacts_api is imported: settings are read at import time
+    # and the default SQLite database lives in the working directory.
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    workdir = tempfile.mkdtemp(prefix="contacts_bench_")
+    os.chdir(workdir)
+    return workdir
+
+
+def create_user(db, email: str, password_hash: str = "not-a-real-hash", is_verified: bool = True):
+    from contacts_api.auth import create_access_token
+    from contacts_api.models import User
+
+    user = User(email=email, password=password_hash, full_name="Bench User", is_verified=is_verified)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    token = create_access_token(data={"sub": user.email, "user_id": user.id, "is_verified": user.is_verified})
+    return user, {"Authorization": f"Bearer {token}"}
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def timed_requests(client, method: str, url: str, count: int, **kwargs):
+    timings = []
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.request(method, url, **kwargs)
+        timings.append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            response.raise_for_status()
+    return timings
+
+
+def report(label: str, timings) -> None:
+    total = sum(timings)
+    rps = len(timings) / total if total else 0.0
+    print(
+        f"{label:<32} {len(timings):>7} req  {rps:>9.1f} req/s  "
+        f"p50 {percentile(timings, 50) * 1000:7.2f} ms  "
+        f"p95 {percentile(timings, 95) * 1000:7.2f} ms  "
+        f"p99 {percentile(timings, 99) * 1000:7.2f} ms"
+    )
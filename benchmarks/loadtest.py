@@ -0,0 +1,454 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from datetime import date, timedelta
+
+from benchmarks.common import free_port, percentile, prepare_environment
+
+# Everything outbound stays on this machine: mail goes to a local SMTP sink and
+# avatars to local storage, whatever the developer's .env says.
+SMTP_PORT = free_port()
+# prepare_environment() moves into a scratch directory; paths on the command line are relative to here.
+LAUNCH_DIR = os.getcwd()
+os.environ.update({
+    "MAIL_SERVER": "127.0.0.1",
+    "MAIL_PORT": str(SMTP_PORT),
+    "MAIL_STARTTLS": "False",
+    "MAIL_SSL_TLS": "False",
+    "MAIL_USE_CREDENTIALS": "False",
+    "OUTBOX_ENABLED": "True",
+    # The load test measures the shipped configuration, response cache included.
+    "RESPONSE_CACHE_ENABLED": "True",
+    "AVATAR_STORAGE": "local",
+    "CLOUDINARY_CLOUD_NAME": "",
+    "CLOUDINARY_API_KEY": "",
+    "CLOUDINARY_API_SECRET": "",
+})
+prepare_environment()
+# main.py logs at INFO, which would print a line per delivered email
+logging.getLogger("mail.log").setLevel(logging.ERROR)
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from aiosmtpd.controller import Controller  # noqa: E402
+from sqlalchemy import insert, select  # noqa: E402
+
+from contacts_api.auth import create_access_token  # noqa: E402
+from contacts_api.database import SessionLocal, async_engine  # noqa: E402
+from contacts_api.main import app  # noqa: E402
+from contacts_api.models import Contact, User, birthday_ordinal  # noqa: E402
+from contacts_api.outbox import email_dispatcher  # noqa: E402
+from contacts_api.utils import hash_password  # noqa: E402
+
+PASSWORD = "load-test-password"
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+FIRST_NAMES = ["Ada", "Alan", "Barbara", "Donald", "Edsger", "Grace", "John", "Ken", "Linus", "Margaret", "Niklaus", "Tim"]
+LAST_NAMES = ["Lovelace", "Turing", "Liskov", "Knuth", "Dijkstra", "Hopper", "Backus", "Thompson", "Torvalds", "Hamilton"]
+
+# (operation, weight): mostly reads, like the traffic of a contacts UI
+MIX = [
+    ("list", 25),
+    ("get", 20),
+    ("search", 15),
+    ("birthdays", 10),
+    ("create", 10),
+    ("update", 8),
+    ("delete", 5),
+    ("login", 5),
+    ("register", 2),
+]
+
+
+class SinkHandler:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+class Account:
+    def __init__(self, email: str, headers: dict, contact_ids: list):
+        self.email = email
+        self.headers = headers
+        self.contact_ids = contact_ids
+        self.created = []
+
+
+def contact_values(key: str, rng: random.Random) -> dict:
+    birthday = date(1960 + rng.randrange(45), 1, 1) + timedelta(days=rng.randrange(365))
+    return {
+        "first_name": rng.choice(FIRST_NAMES),
+        "last_name": rng.choice(LAST_NAMES),
+        "email": f"{key}@example.com",
+        "phone": f"+380{rng.randrange(10**9):09d}",
+        "birthday": birthday,
+        "additional_info": None,
+    }
+
+
+def contact_payload(key: str, rng: random.Random) -> dict:
+    values = contact_values(key, rng)
+    values["birthday"] = values["birthday"].isoformat()
+    return values
+
+
+def seed(users: int, contacts: int, rng: random.Random) -> list:
+    # One bcrypt hash shared by every account keeps seeding fast.
+    password_hash = hash_password(PASSWORD)
+    accounts = []
+    db = SessionLocal()
+    try:
+        for u in range(users):
+            user = User(email=f"load-{u}@example.com", password=password_hash, full_name=f"Load User {u}", is_verified=True)
+            db.add(user)
+            db.flush()
+            rows = []
+            for c in range(contacts):
+                values = contact_values(f"seed-{u}-{c}", rng)
+                values["user_id"] = user.id
+                values["birthday_ordinal"] = birthday_ordinal(values["birthday"])
+                rows.append(values)
+            if rows:
+                db.execute(insert(Contact), rows)
+            db.commit()
+            ids = list(db.execute(select(Contact.id).where(Contact.user_id == user.id)).scalars())
+            token = create_access_token(data={"sub": user.email, "user_id": user.id, "is_verified": True})
+            accounts.append(Account(user.email, {"Authorization": f"Bearer {token}"}, ids))
+    finally:
+        db.close()
+    return accounts
+
+
+class MixPlanner:
+    def __init__(self, accounts: list, rng: random.Random):
+        self.accounts = accounts
+        self.rng = rng
+        self.serial = 0
+        self.operations = [name for name, _ in MIX]
+        self.weights = [weight for _, weight in MIX]
+
+    def next_request(self):
+        # Returns (endpoint label, method, url, request kwargs, callback for the response)
+        rng = self.rng
+        account = rng.choice(self.accounts)
+        self.serial += 1
+        operation = rng.choices(self.operations, self.weights)[0]
+        if operation == "delete" and not account.created:
+            operation = "create"
+        if operation in ("get", "update") and not account.contact_ids and not account.created:
+            operation = "create"
+
+        if operation == "list":
+            return "GET /contacts/", "GET", "/contacts/", {"params": {"limit": 50}, "headers": account.headers}, None
+        if operation == "get":
+            contact_id = rng.choice(account.contact_ids or account.created)
+            return "GET /contacts/{contact_id}", "GET", f"/contacts/{contact_id}", {"headers": account.headers}, None
+        if operation == "search":
+            params = {"q": rng.choice(FIRST_NAMES + LAST_NAMES)[: rng.randint(2, 5)], "limit": 20}
+            return "GET /contacts/search/", "GET", "/contacts/search/", {"params": params, "headers": account.headers}, None
+        if operation == "birthdays":
+            params = {"days": rng.choice([7, 30, 90])}
+            return "GET /contacts/upcoming-birthdays/", "GET", "/contacts/upcoming-birthdays/", {"params": params, "headers": account.headers}, None
+        if operation == "create":
+            payload = contact_payload(f"load-{self.serial}-{time.monotonic_ns()}", rng)
+
+            def remember(response):
+                if response.status_code == 200:
+                    account.created.append(response.json()["id"])
+
+            return "POST /contacts/", "POST", "/contacts/", {"json": payload, "headers": account.headers}, remember
+        if operation == "update":
+            contact_id = rng.choice(account.contact_ids or account.created)
+            payload = contact_payload(f"load-{self.serial}-{time.monotonic_ns()}", rng)
+            return "PUT /contacts/{contact_id}", "PUT", f"/contacts/{contact_id}", {"json": payload, "headers": account.headers}, None
+        if operation == "delete":
+            contact_id = account.created.pop(rng.randrange(len(account.created)))
+            return "DELETE /contacts/{contact_id}", "DELETE", f"/contacts/{contact_id}", {"headers": account.headers}, None
+        if operation == "login":
+            return "POST /auth/login", "POST", "/auth/login", {"json": {"email": account.email, "password": PASSWORD}}, None
+        payload = {"email": f"register-{self.serial}-{time.monotonic_ns()}@example.com", "password": PASSWORD}
+        return "POST /auth/register", "POST", "/auth/register", {"json": payload}, None
+
+
+class ReplayPlanner:
+    # Replays a JSONL capture, one request per line:
+    #   {"method": "GET", "path": "/contacts/{contact_id}", "params": {...}, "json": {...}, "auth": true}
+    # "{contact_id}" is filled with a contact of a random seeded account. Lines without
+    # a method and path (such as the change requests in the repo's requests.jsonl) are skipped.
+    def __init__(self, path: str, accounts: list, rng: random.Random):
+        self.accounts = accounts
+        self.rng = rng
+        self.entries = []
+        self.skipped = 0
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    self.skipped += 1
+                    continue
+                if not isinstance(entry, dict) or not entry.get("method") or not str(entry.get("path", "")).startswith("/"):
+                    self.skipped += 1
+                    continue
+                self.entries.append(entry)
+        self.position = 0
+
+    def next_request(self):
+        entry = self.entries[self.position % len(self.entries)]
+        self.position += 1
+        account = self.rng.choice(self.accounts)
+        method = entry["method"].upper()
+        url = entry["path"]
+        if "{contact_id}" in url:
+            url = url.replace("{contact_id}", str(self.rng.choice(account.contact_ids or [0])))
+        kwargs = {}
+        if entry.get("params"):
+            kwargs["params"] = entry["params"]
+        if entry.get("json") is not None:
+            kwargs["json"] = entry["json"]
+        if entry.get("auth", True):
+            kwargs["headers"] = account.headers
+        return f"{method} {entry['path'].split('?')[0]}", method, url, kwargs, None
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        # Peak rather than current RSS where /proc is unavailable (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+async def drive(client, planner, total: int, concurrency: int) -> dict:
+    samples = {}
+    remaining = total
+    peak_rss_mb = 0.0
+
+    async def worker():
+        nonlocal remaining, peak_rss_mb
+        while remaining > 0:
+            remaining -= 1
+            label, method, url, kwargs, callback = planner.next_request()
+            start = time.perf_counter()
+            response = await client.request(method, url, **kwargs)
+            elapsed = time.perf_counter() - start
+            sample = samples.setdefault(label, {"timings": [], "errors": 0})
+            sample["timings"].append(elapsed)
+            if response.status_code >= 400:
+                sample["errors"] += 1
+            peak_rss_mb = max(peak_rss_mb, current_rss_mb())
+            if callback is not None:
+                callback(response)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - start
+    return summarize(samples, wall, peak_rss_mb)
+
+
+def summarize(samples: dict, wall: float, peak_rss_mb: float) -> dict:
+    endpoints = {}
+    for label, sample in sorted(samples.items()):
+        timings = sample["timings"]
+        endpoints[label] = {
+            "requests": len(timings),
+            "errors": sample["errors"],
+            "rps": len(timings) / wall,
+            "p50_ms": percentile(timings, 50) * 1000,
+            "p95_ms": percentile(timings, 95) * 1000,
+            "p99_ms": percentile(timings, 99) * 1000,
+        }
+    all_timings = [t for sample in samples.values() for t in sample["timings"]]
+    endpoints["total"] = {
+        "requests": len(all_timings),
+        "errors": sum(sample["errors"] for sample in samples.values()),
+        "rps": len(all_timings) / wall,
+        "p50_ms": percentile(all_timings, 50) * 1000,
+        "p95_ms": percentile(all_timings, 95) * 1000,
+        "p99_ms": percentile(all_timings, 99) * 1000,
+        # RSS of the whole process (client, server and event loop), so it is only reported for the run as a whole
+        "process_peak_rss_mb": peak_rss_mb,
+    }
+    return endpoints
+
+
+async def run_inprocess(planner, args) -> dict:
+    email_dispatcher.start()
+    # Unhandled errors become 500s, as they would behind uvicorn
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            await drive(client, planner, args.warmup, args.concurrency)
+            return await drive(client, planner, args.requests, args.concurrency)
+    finally:
+        await email_dispatcher.stop()
+        # Pooled aiosqlite connections belong to this event loop; the uvicorn run gets its own.
+        await async_engine.dispose()
+
+
+def run_uvicorn(planner, args) -> dict:
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="on"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.01)
+
+    async def go():
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            await drive(client, planner, args.warmup, args.concurrency)
+            return await drive(client, planner, args.requests, args.concurrency)
+
+    try:
+        return asyncio.run(go())
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def print_results(mode: str, endpoints: dict) -> None:
+    print(f"\n[{mode}]")
+    print(f"{'endpoint':<36} {'req':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for label, stats in endpoints.items():
+        print(
+            f"{label:<36} {stats['requests']:>6} {stats['errors']:>4} {stats['rps']:>8.1f} "
+            f"{stats['p50_ms']:>8.2f} {stats['p95_ms']:>8.2f} {stats['p99_ms']:>8.2f}"
+        )
+    print(f"process peak RSS: {endpoints['total']['process_peak_rss_mb']:.1f} MB")
+
+
+def compare(results: dict, baseline: dict, tolerance: float, min_delta_ms: float, min_samples: int) -> list:
+    # Latency and process memory may grow by `tolerance` (and latency by at least min_delta_ms, to ignore
+    # jitter on sub-millisecond endpoints); throughput may drop by the same fraction.
+    # p99 is only gated on the total: an endpoint with a few dozen samples has a p99 that is mostly noise,
+    # and endpoints with fewer than min_samples requests have no latency gate at all.
+    regressions = []
+    for mode, endpoints in results.items():
+        for label, stats in endpoints.items():
+            base = baseline.get(mode, {}).get(label)
+            if base is None:
+                continue
+            if label == "total":
+                metrics = ("p50_ms", "p95_ms", "p99_ms")
+            elif min(stats["requests"], base["requests"]) >= min_samples:
+                metrics = ("p50_ms", "p95_ms")
+            else:
+                metrics = ()
+            for metric in metrics:
+                if stats[metric] > base[metric] * (1 + tolerance) and stats[metric] - base[metric] > min_delta_ms:
+                    regressions.append(f"{mode} {label}: {metric} {base[metric]:.2f} -> {stats[metric]:.2f}")
+            if stats["errors"] > base["errors"]:
+                regressions.append(f"{mode} {label}: errors {base['errors']} -> {stats['errors']}")
+        total = baseline.get(mode, {}).get("total")
+        if total is None:
+            continue
+        if endpoints["total"]["rps"] < total["rps"] * (1 - tolerance):
+            regressions.append(f"{mode} total: rps {total['rps']:.1f} -> {endpoints['total']['rps']:.1f}")
+        rss = endpoints["total"]["process_peak_rss_mb"]
+        if rss > total["process_peak_rss_mb"] * (1 + tolerance):
+            regressions.append(f"{mode} total: process_peak_rss_mb {total['process_peak_rss_mb']:.1f} -> {rss:.1f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the contacts API and compare against a stored baseline")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--contacts", type=int, default=200, help="contacts per user")
+    parser.add_argument("--requests", type=int, default=1500, help="measured requests per mode")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mode", choices=["inprocess", "uvicorn", "both"], default="both")
+    parser.add_argument("--replay", help="JSONL capture to replay instead of the synthetic mix")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--min-delta-ms", type=float, default=2.0)
+    parser.add_argument("--min-samples", type=int, default=100, help="endpoints with fewer requests are not latency-gated")
+    parser.add_argument("--output", help="also write the results as JSON to this file")
+    args = parser.parse_args()
+    for name in ("replay", "baseline", "output"):
+        if getattr(args, name):
+            setattr(args, name, os.path.join(LAUNCH_DIR, getattr(args, name)))
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    accounts = seed(args.users, args.contacts, rng)
+    print(f"seeded {args.users} users x {args.contacts} contacts in {time.perf_counter() - start:.1f}s")
+
+    if args.replay:
+        planner = ReplayPlanner(args.replay, accounts, rng)
+        print(f"replaying {len(planner.entries)} requests from {args.replay} ({planner.skipped} lines skipped)")
+        if not planner.entries:
+            sys.exit(f"{args.replay} has no replayable requests")
+    else:
+        planner = MixPlanner(accounts, rng)
+
+    sink = SinkHandler()
+    controller = Controller(sink, hostname="127.0.0.1", port=SMTP_PORT)
+    controller.start()
+    results = {}
+    try:
+        if args.mode in ("inprocess", "both"):
+            results["inprocess"] = asyncio.run(run_inprocess(planner, args))
+            print_results("inprocess", results["inprocess"])
+        if args.mode in ("uvicorn", "both"):
+            results["uvicorn"] = run_uvicorn(planner, args)
+            print_results("uvicorn", results["uvicorn"])
+    finally:
+        controller.stop()
+    print(f"\nemails delivered to the local SMTP sink: {sink.received}")
+
+    params = {
+        "users": args.users,
+        "contacts": args.contacts,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "replay": os.path.basename(args.replay) if args.replay else None,
+        "seed": args.seed,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"params": params, "results": results}, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump({"params": params, "results": results}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline["params"] != params:
+        sys.exit(f"baseline was recorded with {baseline['params']}, this run used {params}")
+    regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms, args.min_samples)
+    if regressions:
+        print("\nPERFORMANCE REGRESSIONS against the baseline:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nno regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,56 +1,78 @@
+import asyncio
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from decouple import config
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
-from cloudinary.uploader import upload as cloudinary_upload
-from cloudinary.utils import cloudinary_url
-from contacts_api.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from contacts_api.database import get_db, get_async_db
 from contacts_api.models import User
 from contacts_api.schemas import UserCreate, UserResponse, Token
-from contacts_api.utils import hash_password, verify_password
-from contacts_api.email_utils import send_email
+from contacts_api.utils import hashing_service
+from contacts_api.outbox import enqueue_email, email_dispatcher
+from contacts_api.cache import TTLCache
+from contacts_api import metrics
+from contacts_api.avatars import (
+    AVATAR_MAX_BYTES, AVATAR_SIZES, AvatarError, avatar_storage, make_thumbnails, sniff_image_type, thumbnail_executor
+)
 from datetime import datetime, timedelta
 
 SECRET_KEY = config("SECRET_KEY", default="supersecretkey")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+USER_CACHE_SIZE = config("USER_CACHE_SIZE", default=10000, cast=int)
+USER_CACHE_TTL = config("USER_CACHE_TTL", default=60, cast=int)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 auth_router = APIRouter()
 
-# Cloudinary Configuration
-CLOUDINARY_CLOUD_NAME = config("CLOUDINARY_CLOUD_NAME")
-CLOUDINARY_API_KEY = config("CLOUDINARY_API_KEY")
-CLOUDINARY_API_SECRET = config("CLOUDINARY_API_SECRET")
+# Authenticated users by id, detached from their session; invalidate whenever a user row changes.
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with metrics.phase("jwt_decode"):
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
+        user_id = payload.get("user_id")
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
+
+    with metrics.phase("user_lookup"):
+        if user_id is not None:
+            user = user_cache.get(user_id)
+            if user is not None and user.email == email:
+                return user
+            result = await db.execute(select(User).where(User.id == user_id))
+        else:
+            # Tokens issued before user_id was added to the claims
+            result = await db.execute(select(User).where(User.email == email))
+        user = result.scalars().first()
+    if user is None or user.email != email:
         raise HTTPException(status_code=401, detail="User not found")
+
+    db.expunge(user)
+    user_cache.set(user.id, user)
     return user
 
 
 @auth_router.post("/register", response_model=UserResponse, status_code=201)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    existing_user = db.query(User).filter(User.email == user.email).first()
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    # Hash before the first query, so the session holds no pooled connection while queued for bcrypt
+    hashed_password = await hashing_service.hash(user.password)
+    result = await db.execute(select(User).where(User.email == user.email))
+    existing_user = result.scalars().first()
     if existing_user:
         raise HTTPException(status_code=409, detail="Email already registered")
 
-    hashed_password = hash_password(user.password)
     new_user = User(email=user.email, password=hashed_password, full_name=user.full_name, is_verified=False)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
 
     verification_link = f"http://127.0.0.1:8000/auth/verify-email?email={new_user.email}"
     email_body = f"""
@@ -58,18 +80,34 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
     <p>Для подтверждения вашего аккаунта перейдите по ссылке:</p>
     <a href="{verification_link}">Подтвердить Email</a>
     """
-    await send_email("Подтверждение Email", new_user.email, email_body)
+    enqueue_email(db, "Подтверждение Email", new_user.email, email_body)
+    await db.commit()
+    await db.refresh(new_user)
+    email_dispatcher.notify()
 
     return new_user
 
 
 @auth_router.post("/login", response_model=Token)
-def login_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
-    if not db_user or not verify_password(user.password, db_user.password):
+async def login_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(User).where(User.email == user.email))
+    db_user = result.scalars().first()
+    if not db_user:
         raise HTTPException(status_code=401, detail="Invalid email or password")
-
-    access_token = create_access_token(data={"sub": db_user.email})
+    # Give the pooled connection back while the verify waits in the bcrypt queue
+    db.expunge(db_user)
+    await db.rollback()
+    valid, new_hash = await hashing_service.verify_and_update(user.password, db_user.password)
+    if not valid:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    if new_hash:
+        # Hash was made with outdated cost settings
+        await db.execute(update(User).where(User.id == db_user.id).values(password=new_hash))
+        await db.commit()
+
+    access_token = create_access_token(
+        data={"sub": db_user.email, "user_id": db_user.id, "is_verified": db_user.is_verified}
+    )
     return {"access_token": access_token, "token_type": "bearer"}
 
 
@@ -90,6 +128,7 @@ def verify_email(email: str, db: Session = Depends(get_db)):
 
     user.is_verified = True
     db.commit()
+    user_cache.invalidate(user.id)
     return {"message": "Email successfully verified"}
 
 
@@ -97,21 +136,29 @@ def verify_email(email: str, db: Session = Depends(get_db)):
 async def upload_avatar(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    data = await file.read(AVATAR_MAX_BYTES + 1)
+    if len(data) > AVATAR_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Avatar must be at most {AVATAR_MAX_BYTES} bytes")
+    if sniff_image_type(data) is None:
+        raise HTTPException(status_code=415, detail="Avatar must be a JPEG, PNG, GIF or WebP image")
+
     try:
-        upload_result = cloudinary_upload(
-            file.file,
-            folder="user_avatars",
-            public_id=f"avatar_{current_user.id}",
-            overwrite=True
+        thumbnails = await asyncio.get_running_loop().run_in_executor(
+            thumbnail_executor, make_thumbnails, data, AVATAR_SIZES
         )
-        avatar_url, _ = cloudinary_url(upload_result["public_id"], format="jpg")
-
-        current_user.avatar_url = avatar_url
-        db.commit()
-        db.refresh(current_user)
+    except AvatarError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        return current_user
+    try:
+        avatar_url = await run_in_threadpool(avatar_storage.save, current_user.id, thumbnails)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to upload avatar: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to upload avatar: {str(e)}")
+
+    result = await db.execute(select(User).where(User.id == current_user.id))
+    user = result.scalars().first()
+    user.avatar_url = avatar_url
+    await db.commit()
+    user_cache.invalidate(user.id)
+    return user
@@ -0,0 +1,122 @@
+import io
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import Dict, Optional
+
+import cloudinary
+from cloudinary.uploader import upload as cloudinary_upload
+from cloudinary.utils import cloudinary_url
+from decouple import config
+from PIL import Image
+
+from contacts_api.utils import LazyPoolExecutor
+
+AVATAR_MAX_BYTES = config("AVATAR_MAX_BYTES", default=5 * 1024 * 1024, cast=int)
+AVATAR_MAX_PIXELS = config("AVATAR_MAX_PIXELS", default=40_000_000, cast=int)
+AVATAR_SIZES = [int(size) for size in config("AVATAR_SIZES", default="64,256").split(",")]
+AVATAR_EXECUTOR = config("AVATAR_EXECUTOR", default="thread")
+AVATAR_WORKERS = config("AVATAR_WORKERS", default=2, cast=int)
+MEDIA_ROOT = config("MEDIA_ROOT", default="./media")
+MEDIA_URL = config("MEDIA_URL", default="/media")
+
+CLOUDINARY_CLOUD_NAME = config("CLOUDINARY_CLOUD_NAME", default="")
+CLOUDINARY_API_KEY = config("CLOUDINARY_API_KEY", default="")
+CLOUDINARY_API_SECRET = config("CLOUDINARY_API_SECRET", default="")
+AVATAR_STORAGE = config("AVATAR_STORAGE", default="cloudinary" if CLOUDINARY_CLOUD_NAME else "local")
+
+IMAGE_SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+
+class AvatarError(Exception):
+    pass
+
+
+def sniff_image_type(data: bytes) -> Optional[str]:
+    # Trust the bytes, not the client's Content-Type or filename.
+    for signature, content_type in IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return content_type
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def make_thumbnails(data: bytes, sizes) -> Dict[int, bytes]:
+    # Runs in the worker pool, so it only takes and returns picklable values.
+    # Pillow only warns between MAX_IMAGE_PIXELS and twice that, so the cap is checked here,
+    # from the header alone, before anything is decoded.
+    Image.MAX_IMAGE_PIXELS = AVATAR_MAX_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if image.width * image.height > AVATAR_MAX_PIXELS:
+                raise AvatarError(f"Image is too large: {image.width}x{image.height} pixels exceeds {AVATAR_MAX_PIXELS}")
+            image.draft("RGB", (max(sizes), max(sizes)))
+            image = image.convert("RGB")
+            side = min(image.size)
+            left = (image.width - side) // 2
+            top = (image.height - side) // 2
+            square = image.crop((left, top, left + side, top + side))
+            thumbnails = {}
+            for size in sizes:
+                buffer = io.BytesIO()
+                square.resize((size, size), Image.LANCZOS).save(buffer, format="JPEG", quality=85, optimize=True)
+                thumbnails[size] = buffer.getvalue()
+            return thumbnails
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise AvatarError(f"Invalid image: {e}")
+
+
+class AvatarStorage(ABC):
+    # Stores every thumbnail and returns the URL of the largest one. Called from a worker thread.
+    @abstractmethod
+    def save(self, user_id: int, thumbnails: Dict[int, bytes]) -> str:
+        ...
+
+
+class LocalAvatarStorage(AvatarStorage):
+    def __init__(self, root: str = MEDIA_ROOT, base_url: str = MEDIA_URL):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+
+    def save(self, user_id: int, thumbnails: Dict[int, bytes]) -> str:
+        directory = os.path.join(self.root, "user_avatars")
+        os.makedirs(directory, exist_ok=True)
+        for size, content in thumbnails.items():
+            path = os.path.join(directory, f"avatar_{user_id}_{size}.jpg")
+            # Write then rename so readers never see a half-written file
+            with tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False) as f:
+                f.write(content)
+            os.replace(f.name, path)
+        return f"{self.base_url}/user_avatars/avatar_{user_id}_{max(thumbnails)}.jpg"
+
+
+class CloudinaryAvatarStorage(AvatarStorage):
+    def __init__(self):
+        cloudinary.config(
+            cloud_name=CLOUDINARY_CLOUD_NAME,
+            api_key=CLOUDINARY_API_KEY,
+            api_secret=CLOUDINARY_API_SECRET,
+            secure=True,
+        )
+
+    def save(self, user_id: int, thumbnails: Dict[int, bytes]) -> str:
+        for size, content in thumbnails.items():
+            cloudinary_upload(content, folder="user_avatars", public_id=f"avatar_{user_id}_{size}", overwrite=True)
+        avatar_url, _ = cloudinary_url(f"user_avatars/avatar_{user_id}_{max(thumbnails)}", format="jpg", secure=True)
+        return avatar_url
+
+
+def create_avatar_storage(kind: str = AVATAR_STORAGE) -> AvatarStorage:
+    if kind == "cloudinary":
+        return CloudinaryAvatarStorage()
+    return LocalAvatarStorage()
+
+
+avatar_storage = create_avatar_storage()
+thumbnail_executor = LazyPoolExecutor(AVATAR_EXECUTOR, AVATAR_WORKERS, thread_name_prefix="thumbnails")
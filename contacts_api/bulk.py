@@ -0,0 +1,168 @@
+import codecs
+import csv
+import io
+import json
+from typing import BinaryIO, Iterator, List, Optional
+
+from decouple import config
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from contacts_api.database import SessionLocal
+from contacts_api.models import Contact, birthday_ordinal
+from contacts_api.schemas import ContactCreate
+
+BULK_BATCH_SIZE = config("BULK_BATCH_SIZE", default=1000, cast=int)
+BULK_MAX_REPORTED_ERRORS = config("BULK_MAX_REPORTED_ERRORS", default=1000, cast=int)
+STREAM_BATCH_SIZE = config("STREAM_BATCH_SIZE", default=500, cast=int)
+
+EXPORT_FIELDS = ["id", "first_name", "last_name", "email", "phone", "birthday", "additional_info"]
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    if content_type:
+        for fmt, media_type in FORMATS.items():
+            if content_type.startswith(media_type):
+                return fmt
+        if content_type.startswith("application/json") or content_type.startswith("application/jsonl"):
+            return "ndjson"
+    if filename:
+        extension = filename.rsplit(".", 1)[-1].lower()
+        if extension == "csv":
+            return "csv"
+        if extension in ("ndjson", "jsonl"):
+            return "ndjson"
+    return None
+
+
+def read_rows(file: BinaryIO, fmt: str) -> Iterator[tuple]:
+    # Yields (row_number, data, parse_error) one line at a time, never holding the whole file.
+    text = codecs.getreader("utf-8-sig")(file, errors="replace")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            # Empty cells mean "not set" for optional fields
+            yield number, {key: (value if value != "" else None) for key, value in row.items() if key}, None
+        return
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(data, dict):
+            yield number, None, "Expected a JSON object"
+            continue
+        yield number, data, None
+
+
+class ImportReport:
+    def __init__(self):
+        self.inserted = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, row: int, errors) -> None:
+        self.failed += 1
+        if len(self.errors) < BULK_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "errors": errors})
+
+    def as_dict(self) -> dict:
+        errors = sorted(self.errors, key=lambda error: error["row"])
+        return {"inserted": self.inserted, "failed": self.failed, "errors": errors}
+
+
+def insert_batch(db, batch: List[tuple], report: ImportReport) -> None:
+    emails = [values["email"] for _, values in batch]
+    taken = set(db.execute(select(Contact.email).where(Contact.email.in_(emails))).scalars())
+    rows = []
+    for number, values in batch:
+        if values["email"] in taken:
+            report.add_error(number, [{"loc": ["email"], "msg": "Contact with this email already exists"}])
+            continue
+        taken.add(values["email"])
+        rows.append((number, values))
+    if not rows:
+        return
+    try:
+        db.execute(insert(Contact), [values for _, values in rows])
+        db.commit()
+        report.inserted += len(rows)
+    except IntegrityError:
+        # Lost a race with a concurrent write; retry row by row to find the offenders.
+        db.rollback()
+        for number, values in rows:
+            try:
+                db.execute(insert(Contact), values)
+                db.commit()
+                report.inserted += 1
+            except IntegrityError as e:
+                db.rollback()
+                report.add_error(number, [{"loc": [], "msg": str(e.orig)}])
+
+
+def import_contacts(file: BinaryIO, fmt: str, user_id: int) -> dict:
+    report = ImportReport()
+    batch = []
+    db = SessionLocal()
+    try:
+        for number, data, parse_error in read_rows(file, fmt):
+            if parse_error:
+                report.add_error(number, [{"loc": [], "msg": parse_error}])
+                continue
+            try:
+                contact = ContactCreate.model_validate(data)
+            except ValidationError as e:
+                report.add_error(number, [{"loc": list(err["loc"]), "msg": err["msg"]} for err in e.errors()])
+                continue
+            values = contact.model_dump()
+            values["user_id"] = user_id
+            values["birthday_ordinal"] = birthday_ordinal(contact.birthday)
+            batch.append((number, values))
+            if len(batch) >= BULK_BATCH_SIZE:
+                insert_batch(db, batch, report)
+                batch = []
+        if batch:
+            insert_batch(db, batch, report)
+    finally:
+        db.close()
+    return report.as_dict()
+
+
+def format_ndjson(rows) -> str:
+    lines = []
+    for row in rows:
+        data = dict(zip(EXPORT_FIELDS, row))
+        if data["birthday"] is not None:
+            data["birthday"] = data["birthday"].isoformat()
+        lines.append(json.dumps(data, ensure_ascii=False))
+    return "\n".join(lines) + "\n"
+
+
+def format_csv(rows) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+def stream_contacts(user_id: int, cursor: Optional[int] = None, fmt: str = "ndjson") -> Iterator[str]:
+    # The request-scoped session may be closed before the body is sent, so the stream owns its own.
+    # Plain column tuples skip ORM and pydantic overhead for every row.
+    formatter = format_csv if fmt == "csv" else format_ndjson
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            yield format_csv([EXPORT_FIELDS])
+        query = select(*(getattr(Contact, field) for field in EXPORT_FIELDS)).where(Contact.user_id == user_id)
+        if cursor is not None:
+            query = query.where(Contact.id > cursor)
+        result = db.execute(query.order_by(Contact.id).execution_options(stream_results=True, yield_per=STREAM_BATCH_SIZE))
+        for rows in result.partitions():
+            yield formatter(rows)
+    finally:
+        db.close()
@@ -1,9 +1,144 @@
-from sqlalchemy import create_engine
+import threading
+from contextlib import asynccontextmanager
+
+from decouple import config
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+SQLALCHEMY_DATABASE_URL = config("DATABASE_URL", default="sqlite:///./test.db")
+DB_ASYNC = config("DB_ASYNC", default=True, cast=bool)
+DB_POOL_SIZE = config("DB_POOL_SIZE", default=10, cast=int)
+DB_MAX_OVERFLOW = config("DB_MAX_OVERFLOW", default=20, cast=int)
+DB_POOL_RECYCLE = config("DB_POOL_RECYCLE", default=1800, cast=int)
+SQLITE_BUSY_TIMEOUT_MS = config("SQLITE_BUSY_TIMEOUT_MS", default=5000, cast=int)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}"
+
+
+ASYNC_DATABASE_URL = config("ASYNC_DATABASE_URL", default=to_async_url(SQLALCHEMY_DATABASE_URL))
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+
+
+def pool_options(url: str) -> dict:
+    # In-memory SQLite gets a single-connection pool that takes no sizing arguments
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and (parsed.database in (None, "", ":memory:") or "mode=memory" in url):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": not IS_SQLITE,
+    }
+
+
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False} if IS_SQLITE else {},
+    **pool_options(SQLALCHEMY_DATABASE_URL),
+)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL))
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers proceed during a write; busy_timeout waits for the write lock instead of failing.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+if IS_SQLITE:
+    event.listen(engine, "connect", set_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragmas)
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+class SyncSessionAdapter:
+    # Exposes the subset of the AsyncSession API used by the handlers on top of a sync Session.
+    # Calls hop between worker threads, and a cancelled request can leave one still running
+    # when close() starts, so the lock keeps the session and its connection to one thread at a time.
+    def __init__(self, session):
+        self.session = session
+        self._lock = threading.Lock()
+
+    def _locked(self, func, *args):
+        with self._lock:
+            return func(*args)
+
+    async def _run(self, func, *args):
+        return await run_in_threadpool(self._locked, func, *args)
+
+    async def execute(self, statement):
+        return await self._run(self.session.execute, statement)
+
+    async def scalar(self, statement):
+        return await self._run(self.session.scalar, statement)
+
+    def add(self, instance):
+        self.session.add(instance)
+
+    def add_all(self, instances):
+        self.session.add_all(instances)
+
+    def expunge(self, instance):
+        self.session.expunge(instance)
+
+    async def delete(self, instance):
+        await self._run(self.session.delete, instance)
+
+    async def flush(self):
+        await self._run(self.session.flush)
+
+    async def commit(self):
+        await self._run(self.session.commit)
+
+    async def rollback(self):
+        await self._run(self.session.rollback)
+
+    async def refresh(self, instance):
+        await self._run(self.session.refresh, instance)
+
+    async def close(self):
+        await self._run(self.session.close)
+
+
+async def get_async_db():
+    if not DB_ASYNC:
+        db = SyncSessionAdapter(SessionLocal(expire_on_commit=False))
+        try:
+            yield db
+        finally:
+            await db.close()
+        return
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# For code outside a request, e.g. background tasks
+async_session_scope = asynccontextmanager(get_async_db)
@@ -11,12 +11,12 @@ conf = ConnectionConfig(
     MAIL_PORT=config("MAIL_PORT", cast=int),
     MAIL_SERVER=config("MAIL_SERVER"),
     MAIL_FROM_NAME=config("MAIL_FROM_NAME"),
-    MAIL_TLS=True,
-    MAIL_SSL=False,
-    USE_CREDENTIALS=True,
+    MAIL_STARTTLS=config("MAIL_STARTTLS", default=True, cast=bool),
+    MAIL_SSL_TLS=config("MAIL_SSL_TLS", default=False, cast=bool),
+    USE_CREDENTIALS=config("MAIL_USE_CREDENTIALS", default=True, cast=bool),
+    VALIDATE_CERTS=config("MAIL_VALIDATE_CERTS", default=True, cast=bool),
 )
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 async def send_email(subject: str, email_to: str, body: str) -> None:
@@ -0,0 +1,60 @@
+import hashlib
+from typing import Awaitable, Callable, Tuple
+
+from decouple import config
+from fastapi import Request, Response
+from sqlalchemy import select
+
+from contacts_api.cache import ResponseCache
+from contacts_api.models import User
+
+RESPONSE_CACHE_ENABLED = config("RESPONSE_CACHE_ENABLED", default=True, cast=bool)
+RESPONSE_CACHE_MAX_BYTES = config("RESPONSE_CACHE_MAX_BYTES", default=64 * 1024 * 1024, cast=int)
+RESPONSE_CACHE_MAX_ENTRIES = config("RESPONSE_CACHE_MAX_ENTRIES", default=10000, cast=int)
+
+response_cache = ResponseCache(
+    max_bytes=RESPONSE_CACHE_MAX_BYTES,
+    max_entries=RESPONSE_CACHE_MAX_ENTRIES if RESPONSE_CACHE_ENABLED else 0,
+)
+
+
+async def get_contacts_version(db, user_id: int) -> int:
+    result = await db.execute(select(User.contacts_version).where(User.id == user_id))
+    return result.scalar() or 0
+
+
+def make_etag(user_id: int, version: int, request: Request) -> str:
+    # Same user, version and URL always serialize to the same bytes, so the tag can be strong.
+    key = f"{user_id}:{version}:{request.url.path}?{request.url.query}"
+    return '"' + hashlib.blake2b(key.encode(), digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    # "*" is not honoured: it is checked before the handler knows the resource exists, so it would turn 404s into 304s.
+    # A real tag is safe, since deleting a contact bumps the version it was made from.
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+async def conditional_json_response(
+    request: Request,
+    db,
+    user_id: int,
+    build: Callable[[], Awaitable[Tuple[bytes, dict]]],
+) -> Response:
+    version = await get_contacts_version(db, user_id)
+    etag = make_etag(user_id, version, request)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    key = (user_id, request.url.path, request.url.query, version)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        response_cache.record_not_modified(key)
+        return Response(status_code=304, headers=headers)
+
+    cached = response_cache.get(key)
+    if cached is None:
+        body, extra_headers = await build()
+        response_cache.set(key, body, extra_headers)
+    else:
+        body, extra_headers = cached
+    return Response(content=body, media_type="application/json", headers={**headers, **extra_headers})
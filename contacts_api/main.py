@@ -1,15 +1,51 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlalchemy.orm import Session
-from contacts_api.database import SessionLocal, engine
-from contacts_api.models import Base, Contact, User
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, UploadFile, File
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from sqlalchemy import select, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from contacts_api.database import engine, async_engine, get_async_db
+from contacts_api.models import Base, Contact, User, birthday_ordinal
+from contacts_api.migrations import run_migrations
 from contacts_api.schemas import ContactCreate, ContactResponse
-from contacts_api.auth import auth_router, get_current_user
+from contacts_api.auth import auth_router, get_current_user, user_cache
+from contacts_api.utils import hashing_service
+from contacts_api.outbox import OUTBOX_ENABLED, email_dispatcher
+from contacts_api.search import init_search_index, search_user_contacts
+from contacts_api.bulk import FORMATS, detect_format, import_contacts, stream_contacts
+from contacts_api.http_cache import conditional_json_response, response_cache
+from pydantic import TypeAdapter
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from contacts_api.middleware import BodySizeLimitMiddleware, MetricsMiddleware, RateLimitMiddleware
+from contacts_api.ratelimit import rate_limiter
+from contacts_api import metrics
+from contacts_api.avatars import AVATAR_MAX_BYTES, MEDIA_ROOT, MEDIA_URL, LocalAvatarStorage, avatar_storage, thumbnail_executor
 from typing import List, Optional
 from datetime import date, timedelta
+import calendar
+import logging
 
+logging.basicConfig(level=logging.INFO)
+
+
+if metrics.METRICS_ENABLED:
+    metrics.instrument_engine(engine)
+    metrics.instrument_engine(async_engine.sync_engine)
 
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
+init_search_index(engine)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+contact_list_adapter = TypeAdapter(List[ContactResponse])
+
+def serialize_contacts(contacts) -> bytes:
+    with metrics.phase("serialization"):
+        return contact_list_adapter.dump_json(contact_list_adapter.validate_python(contacts, from_attributes=True))
 
 app = FastAPI()
 
@@ -19,101 +55,195 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# Leave room for the multipart framing around the image itself
+app.add_middleware(BodySizeLimitMiddleware, limits={"/auth/upload-avatar": AVATAR_MAX_BYTES + 64 * 1024})
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, paths={"/auth/login", "/auth/register"})
+# Added last so it wraps everything else and times the whole request
+app.add_middleware(MetricsMiddleware)
+
+metrics.collectors.update({
+    "user_cache": user_cache.stats,
+    "response_cache": response_cache.stats,
+    "email_outbox": email_dispatcher.stats,
+    "password_hashing": hashing_service.stats,
+    "rate_limit": rate_limiter.stats,
+})
+
+if isinstance(avatar_storage, LocalAvatarStorage):
+    app.mount(MEDIA_URL, StaticFiles(directory=MEDIA_ROOT, check_dir=False), name="media")
 
 app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("startup")
+async def start_background_tasks():
+    if OUTBOX_ENABLED:
+        email_dispatcher.start()
+
+@app.on_event("shutdown")
+async def shutdown_resources():
+    await email_dispatcher.stop()
+    hashing_service.shutdown()
+    thumbnail_executor.shutdown(wait=False)
+    await async_engine.dispose()
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    return PlainTextResponse(metrics.render_metrics(), media_type="text/plain; version=0.0.4")
 
 @app.post("/contacts/", response_model=ContactResponse)
-def create_contact(
+async def create_contact(
     contact: ContactCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_contact = Contact(**contact.dict(), user_id=current_user.id)
+    db_contact = Contact(**contact.model_dump(), user_id=current_user.id)
     db.add(db_contact)
-    db.commit()
-    db.refresh(db_contact)
+    await db.commit()
     return db_contact
 
+async def get_user_contact(db: AsyncSession, contact_id: int, user_id: int) -> Contact:
+    result = await db.execute(select(Contact).where(Contact.id == contact_id, Contact.user_id == user_id))
+    contact = result.scalars().first()
+    if not contact:
+        raise HTTPException(status_code=404, detail="Contact not found")
+    return contact
+
 @app.get("/contacts/", response_model=List[ContactResponse])
-def get_contacts(
-    db: Session = Depends(get_db),
+async def get_contacts(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[int] = Query(None, description="Return contacts with id greater than this value"),
+    stream: bool = Query(False, description="Stream all contacts after the cursor as NDJSON"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_user)
+):
+    if stream:
+        return StreamingResponse(stream_contacts(current_user.id, cursor), media_type="application/x-ndjson")
+
+    async def build():
+        query = select(Contact).where(Contact.user_id == current_user.id)
+        if cursor is not None:
+            query = query.where(Contact.id > cursor)
+        result = await db.execute(query.order_by(Contact.id).limit(limit))
+        contacts = result.scalars().all()
+        headers = {"X-Next-Cursor": str(contacts[-1].id)} if len(contacts) == limit else {}
+        return serialize_contacts(contacts), headers
+
+    return await conditional_json_response(request, db, current_user.id, build)
+
+@app.post("/contacts/bulk")
+async def bulk_import_contacts(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$", description="Defaults to the upload's content type or extension"),
+    current_user: User = Depends(get_current_user)
+):
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=415, detail="Upload a CSV or NDJSON file")
+    return await run_in_threadpool(import_contacts, file.file, fmt, current_user.id)
+
+@app.get("/contacts/export")
+async def export_contacts(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
     current_user: User = Depends(get_current_user)
 ):
-    return db.query(Contact).filter(Contact.user_id == current_user.id).all()
+    return StreamingResponse(
+        stream_contacts(current_user.id, fmt=format),
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="contacts.{format}"'},
+    )
 
 @app.get("/contacts/{contact_id}", response_model=ContactResponse)
-def get_contact(
+async def get_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == current_user.id).first()
-    if not contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    return contact
+    async def build():
+        contact = await get_user_contact(db, contact_id, current_user.id)
+        with metrics.phase("serialization"):
+            return ContactResponse.model_validate(contact).model_dump_json().encode(), {}
+
+    return await conditional_json_response(request, db, current_user.id, build)
 
 @app.put("/contacts/{contact_id}", response_model=ContactResponse)
-def update_contact(
+async def update_contact(
     contact_id: int,
     contact: ContactCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == current_user.id).first()
-    if not db_contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    for key, value in contact.dict().items():
+    db_contact = await get_user_contact(db, contact_id, current_user.id)
+    for key, value in contact.model_dump().items():
         setattr(db_contact, key, value)
-    db.commit()
-    db.refresh(db_contact)
+    await db.commit()
     return db_contact
 
 @app.delete("/contacts/{contact_id}")
-def delete_contact(
+async def delete_contact(
     contact_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    db_contact = db.query(Contact).filter(Contact.id == contact_id, Contact.user_id == current_user.id).first()
-    if not db_contact:
-        raise HTTPException(status_code=404, detail="Contact not found")
-    db.delete(db_contact)
-    db.commit()
+    db_contact = await get_user_contact(db, contact_id, current_user.id)
+    await db.delete(db_contact)
+    await db.commit()
     return {"message": "Contact deleted successfully"}
 
 @app.get("/contacts/search/", response_model=List[ContactResponse])
-def search_contacts(
+async def search_contacts(
+    request: Request,
+    q: Optional[str] = Query(None, description="Prefix search over first name, last name and email, ranked"),
+    limit: int = Query(DEFAULT_SEARCH_LIMIT, ge=1, le=MAX_SEARCH_LIMIT),
     first_name: Optional[str] = None,
     last_name: Optional[str] = None,
     email: Optional[str] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
-    query = db.query(Contact).filter(Contact.user_id == current_user.id)
-    if first_name:
-        query = query.filter(Contact.first_name.ilike(f"%{first_name}%"))
-    if last_name:
-        query = query.filter(Contact.last_name.ilike(f"%{last_name}%"))
-    if email:
-        query = query.filter(Contact.email.ilike(f"%{email}%"))
-    return query.all()
+    async def build():
+        if q is not None:
+            contacts = await search_user_contacts(db, current_user.id, q, limit)
+        else:
+            # Per-field substring filters, kept for existing clients; these can't use an index.
+            query = select(Contact).where(Contact.user_id == current_user.id)
+            if first_name:
+                query = query.where(Contact.first_name.ilike(f"%{first_name}%"))
+            if last_name:
+                query = query.where(Contact.last_name.ilike(f"%{last_name}%"))
+            if email:
+                query = query.where(Contact.email.ilike(f"%{email}%"))
+            result = await db.execute(query.order_by(Contact.id).limit(limit))
+            contacts = result.scalars().all()
+        return serialize_contacts(contacts), {}
+
+    return await conditional_json_response(request, db, current_user.id, build)
 
 @app.get("/contacts/upcoming-birthdays/", response_model=List[ContactResponse])
-def get_upcoming_birthdays(
-    db: Session = Depends(get_db),
+async def get_upcoming_birthdays(
+    days: int = Query(7, ge=1, le=365, description="Number of days after today to include"),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
     today = date.today()
-    next_week = today + timedelta(days=7)
-    return db.query(Contact).filter(
-        Contact.user_id == current_user.id,
-        Contact.birthday.between(today, next_week)
-    ).all()
+    start = birthday_ordinal(today)
+    end = birthday_ordinal(today + timedelta(days=days))
+    if start == 61 and not calendar.isleap(today.year):
+        # Feb 29 birthdays are celebrated on Mar 1 in common years
+        start = 60
+    if days >= 365:
+        window = Contact.birthday_ordinal.isnot(None)
+    elif start <= end:
+        window = Contact.birthday_ordinal.between(start, end)
+    else:
+        window = or_(Contact.birthday_ordinal >= start, Contact.birthday_ordinal <= end)
+    days_until = (Contact.birthday_ordinal - start + 366) % 366
+    result = await db.execute(
+        select(Contact)
+        .where(Contact.user_id == current_user.id, window)
+        .order_by(days_until, Contact.id)
+    )
+    return result.scalars().all()
@@ -0,0 +1,187 @@
+import bisect
+import contextvars
+import cProfile
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+from decouple import config
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = config("METRICS_ENABLED", default=True, cast=bool)
+PROFILER_SAMPLE_RATE = config("PROFILER_SAMPLE_RATE", default=0.0, cast=float)
+PROFILER_KEEP = config("PROFILER_KEEP", default=20, cast=int)
+PROFILER_DIR = config("PROFILER_DIR", default="./profiles")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # Per-bucket counts plus a +Inf slot, then sum and count
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in sorted(snapshot):
+            label_text = ",".join(f'{name}="{escape(value)}"' for name, value in zip(self.labelnames, labels))
+            prefix = label_text + "," if label_text else ""
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {count}')
+            lines.append(f"{self.name}_sum{{{label_text}}} {total}")
+            lines.append(f"{self.name}_count{{{label_text}}} {count}")
+        return lines
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Time spent handling a request", ("route", "method", "status")
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request", ("route",), buckets=COUNT_BUCKETS
+)
+DB_TIME = Histogram("http_request_db_seconds", "Time spent in SQL per request", ("route",))
+PHASE_DURATION = Histogram(
+    "http_request_phase_seconds", "Time spent per request phase (jwt_decode, user_lookup, serialization)", ("route", "phase")
+)
+HISTOGRAMS = [REQUEST_DURATION, DB_QUERIES, DB_TIME, PHASE_DURATION]
+
+# Callables returning {metric_name: value} for gauges and counters owned by other modules.
+collectors: Dict[str, Callable[[], dict]] = {}
+
+
+class RequestStats:
+    __slots__ = ("db_queries", "db_time", "phases")
+
+    def __init__(self):
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.phases = {}
+
+
+current_request_stats: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request_stats", default=None
+)
+
+
+@contextmanager
+def phase(name: str):
+    stats = current_request_stats.get()
+    if stats is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.phases[name] = stats.phases.get(name, 0.0) + time.perf_counter() - start
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_time += time.perf_counter() - context._metrics_start
+
+
+def instrument_engine(engine) -> None:
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", after_cursor_execute)
+
+
+def observe_request(route: str, method: str, status: int, duration: float, stats: RequestStats) -> None:
+    REQUEST_DURATION.observe((route, method, str(status)), duration)
+    DB_QUERIES.observe((route,), stats.db_queries)
+    DB_TIME.observe((route,), stats.db_time)
+    for name, seconds in stats.phases.items():
+        PHASE_DURATION.observe((route, name), seconds)
+
+
+def render_metrics() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    for prefix, collect in collectors.items():
+        for name, value in collect().items():
+            metric = re.sub(r"[^a-zA-Z0-9_]", "_", f"{prefix}_{name}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {float(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class SlowRequestProfiler:
+    # Profiles a random sample of requests and keeps the dumps of the slowest ones.
+    def __init__(self, sample_rate: float = PROFILER_SAMPLE_RATE, keep: int = PROFILER_KEEP, directory: str = PROFILER_DIR):
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.directory = directory
+        self._active = False
+        self._kept = []
+
+    def start(self) -> Optional[cProfile.Profile]:
+        # cProfile sees the whole thread, so only one sampled request is profiled at a time.
+        if self.sample_rate <= 0 or self._active or random.random() >= self.sample_rate:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        self._active = True
+        return profile
+
+    def finish(self, profile: cProfile.Profile, route: str, duration: float) -> None:
+        profile.disable()
+        self._active = False
+        if len(self._kept) >= self.keep and duration <= self._kept[0][0]:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        safe_route = re.sub(r"[^a-zA-Z0-9]+", "_", route).strip("_") or "root"
+        path = os.path.join(self.directory, f"{duration * 1000:010.1f}ms_{safe_route}_{time.time_ns()}.prof")
+        profile.dump_stats(path)
+        bisect.insort(self._kept, (duration, path))
+        while len(self._kept) > self.keep:
+            _, fastest = self._kept.pop(0)
+            try:
+                os.remove(fastest)
+            except OSError:
+                pass
+        logger.info(f"Profiled slow request {route} ({duration * 1000:.1f} ms): {path}")
+
+
+profiler = SlowRequestProfiler()
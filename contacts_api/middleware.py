@@ -0,0 +1,198 @@
+import json
+import math
+import time
+
+from starlette.routing import Mount
+
+from contacts_api import metrics
+from contacts_api.ratelimit import RATE_LIMIT_ENABLED, RATE_LIMIT_MAX_BODY, RATE_LIMIT_TRUST_FORWARDED, RateLimiter
+
+
+class BodySizeLimitMiddleware:
+    # Rejects oversized uploads while they stream in, before the multipart parser spools them to disk.
+    def __init__(self, app, limits: dict):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self.reject(send, limit)
+            return
+
+        received = 0
+        rejected = False
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Answer now and make the app see a disconnect, so nothing more is read or spooled
+                    rejected = True
+                    if not response_started:
+                        await self.reject(send, limit)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, guarded_send)
+
+    async def reject(self, send, limit: int):
+        body = json.dumps({"detail": f"Request body exceeds {limit} bytes"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class MetricsMiddleware:
+    # Times each request and records its SQL and phase breakdown under the matched route template.
+    def __init__(self, app):
+        self.app = app
+        self.route_paths = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not metrics.METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = metrics.RequestStats()
+        token = metrics.current_request_stats.set(stats)
+        status = 500
+
+        async def recording_send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profile = metrics.profiler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            duration = time.perf_counter() - start
+            metrics.current_request_stats.reset(token)
+            route_path = self.route_path(scope)
+            if profile is not None:
+                metrics.profiler.finish(profile, route_path, duration)
+            metrics.observe_request(route_path, scope["method"], status, duration, stats)
+
+    def route_path(self, scope) -> str:
+        route = scope.get("route")
+        # Mounted apps such as the /media static files set no route, only their app as the endpoint
+        key = route if route is not None else scope.get("endpoint")
+        if key is None:
+            return "unmatched"
+        if id(key) not in self.route_paths and "app" in scope:
+            self.route_paths = collect_route_paths(scope["app"].router.routes)
+        return self.route_paths.get(id(key), route.path if route is not None else "unmatched")
+
+
+def collect_route_paths(routes, prefix: str = "", paths: dict = None) -> dict:
+    # Included routers keep their routes' own paths (scope["route"].path is "/login", not "/auth/login"),
+    # so the full template is rebuilt from the include prefixes, keyed by the route object.
+    paths = {} if paths is None else paths
+    for route in routes:
+        context = getattr(route, "include_context", None)
+        router = getattr(route, "original_router", None)
+        if context is not None and router is not None:
+            collect_route_paths(router.routes, prefix + (context.prefix or ""), paths)
+        elif isinstance(route, Mount):
+            paths[id(route.app)] = prefix + route.path
+        elif hasattr(route, "path"):
+            paths[id(route)] = prefix + route.path
+    return paths
+
+
+class RateLimitMiddleware:
+    # Throttles the credential endpoints per client IP and per account before any
+    # password hashing or database work, so a rejected attempt costs a dict lookup.
+    def __init__(self, app, limiter: RateLimiter, paths: set):
+        self.app = app
+        self.limiter = limiter
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths or not RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        # The account lives in the JSON body, so buffer it (credential payloads are tiny) and replay it to the app.
+        messages = []
+        body = b""
+        more_body = True
+        while more_body and len(body) <= RATE_LIMIT_MAX_BODY:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+        # A body too big to read the account from would otherwise skip the account bucket, so fail closed
+        if len(body) > RATE_LIMIT_MAX_BODY:
+            await self.reject(send, 413, f"Request body exceeds {RATE_LIMIT_MAX_BODY} bytes")
+            return
+
+        allowed, retry_after = await self.limiter.check(scope["path"], self.client_ip(scope), self.account(body))
+        if not allowed:
+            await self.reject(send, 429, "Too many requests", [(b"retry-after", str(max(1, math.ceil(retry_after))).encode())])
+            return
+
+        async def replay_receive():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        await self.app(scope, replay_receive, send)
+
+    def client_ip(self, scope):
+        if RATE_LIMIT_TRUST_FORWARDED:
+            forwarded = dict(scope["headers"]).get(b"x-forwarded-for")
+            if forwarded:
+                # The proxy appends the address it saw, so only the last entry can't be set by the client.
+                return forwarded.split(b",")[-1].strip().decode("latin-1")
+        client = scope.get("client")
+        return client[0] if client else None
+
+    def account(self, body: bytes):
+        try:
+            data = json.loads(body)
+        except ValueError:
+            return None
+        email = data.get("email") if isinstance(data, dict) else None
+        return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+    async def reject(self, send, status: int, detail: str, headers: list = ()):
+        body = json.dumps({"detail": detail}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,171 @@
+import logging
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import inspect, text
+
+from contacts_api.database import IS_SQLITE
+from contacts_api.models import birthday_ordinal
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 1000
+
+# create_all only creates missing tables, so columns added to existing tables are listed here.
+ADDED_COLUMNS = [
+    ("users", "avatar_url", "VARCHAR"),
+    ("contacts", "birthday_ordinal", "INTEGER"),
+    ("users", "contacts_version", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+ADDED_INDEXES = [
+    ("ix_contacts_user_id_id", "contacts", "user_id, id"),
+    ("ix_contacts_user_id_birthday_ordinal", "contacts", "user_id, birthday_ordinal"),
+]
+
+
+# users.contacts_version is bumped inside the contact write itself. A separate UPDATE before
+# commit would take SQLite's write lock in one await and hold it until the commit in a later one.
+SQLITE_VERSION_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_version_ai AFTER INSERT ON contacts BEGIN
+        UPDATE users SET contacts_version = contacts_version + 1 WHERE id = new.user_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_version_au AFTER UPDATE ON contacts BEGIN
+        UPDATE users SET contacts_version = contacts_version + 1 WHERE id IN (old.user_id, new.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS contacts_version_ad AFTER DELETE ON contacts BEGIN
+        UPDATE users SET contacts_version = contacts_version + 1 WHERE id = old.user_id;
+    END
+    """,
+]
+
+POSTGRES_VERSION_TRIGGERS = [
+    """
+    CREATE OR REPLACE FUNCTION bump_contacts_version() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE users SET contacts_version = contacts_version + 1 WHERE id = OLD.user_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR NEW.user_id IS DISTINCT FROM OLD.user_id) THEN
+            UPDATE users SET contacts_version = contacts_version + 1 WHERE id = NEW.user_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS contacts_version ON contacts",
+    """
+    CREATE TRIGGER contacts_version AFTER INSERT OR UPDATE OR DELETE ON contacts
+    FOR EACH ROW EXECUTE FUNCTION bump_contacts_version()
+    """,
+]
+
+
+def add_missing_columns(connection) -> list:
+    inspector = inspect(connection)
+    added = []
+    for table, column, column_type in ADDED_COLUMNS:
+        existing = {c["name"] for c in inspector.get_columns(table)}
+        if column not in existing:
+            connection.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+            added.append((table, column))
+    return added
+
+
+def add_missing_indexes(connection) -> None:
+    for name, table, columns in ADDED_INDEXES:
+        connection.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+
+
+def install_version_triggers(connection) -> None:
+    for statement in SQLITE_VERSION_TRIGGERS if IS_SQLITE else POSTGRES_VERSION_TRIGGERS:
+        connection.exec_driver_sql(statement)
+
+
+def convert_birthday_column(connection) -> None:
+    # SQLite stores DATE as ISO text, so only real databases need the type change.
+    if IS_SQLITE:
+        return
+    columns = {c["name"]: c for c in inspect(connection).get_columns("contacts")}
+    if str(columns["birthday"]["type"]).upper() != "DATE":
+        # The cast aborts on the first bad value, so normalise or clear every row beforehand
+        normalize_text_birthdays(connection)
+        connection.exec_driver_sql(
+            "ALTER TABLE contacts ALTER COLUMN birthday TYPE DATE USING NULLIF(birthday, '')::date"
+        )
+
+
+def parse_birthday(contact_id: int, raw: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(raw.strip()[:10])
+    except ValueError:
+        logger.warning("Contact %s has an unparseable birthday %r, clearing it", contact_id, raw)
+        return None
+
+
+def normalize_text_birthdays(connection) -> None:
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            text(
+                "SELECT id, birthday FROM contacts "
+                "WHERE birthday IS NOT NULL AND id > :last_id ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BACKFILL_BATCH_SIZE},
+        ).all()
+        if not rows:
+            return
+        params = []
+        for contact_id, raw in rows:
+            value = parse_birthday(contact_id, raw) if raw.strip() else None
+            normalized = value.isoformat() if value else None
+            if normalized != raw:
+                params.append({"id": contact_id, "birthday": normalized})
+        if params:
+            connection.execute(text("UPDATE contacts SET birthday = :birthday WHERE id = :id"), params)
+        last_id = rows[-1][0]
+
+
+def backfill_birthday_ordinals(connection) -> int:
+    updated = 0
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            text(
+                "SELECT id, CAST(birthday AS VARCHAR) FROM contacts "
+                "WHERE birthday IS NOT NULL AND birthday_ordinal IS NULL AND id > :last_id "
+                "ORDER BY id LIMIT :limit"
+            ),
+            {"last_id": last_id, "limit": BACKFILL_BATCH_SIZE},
+        ).all()
+        if not rows:
+            return updated
+        params = []
+        for contact_id, raw in rows:
+            value = parse_birthday(contact_id, raw)
+            if value is None:
+                params.append({"id": contact_id, "birthday": None, "ordinal": None})
+                continue
+            params.append({"id": contact_id, "birthday": value.isoformat(), "ordinal": birthday_ordinal(value)})
+        connection.execute(
+            text("UPDATE contacts SET birthday = :birthday, birthday_ordinal = :ordinal WHERE id = :id"),
+            params,
+        )
+        updated += len(params)
+        last_id = rows[-1][0]
+
+
+def run_migrations(engine) -> None:
+    with engine.begin() as connection:
+        add_missing_columns(connection)
+        add_missing_indexes(connection)
+        convert_birthday_column(connection)
+        updated = backfill_birthday_ordinals(connection)
+        install_version_triggers(connection)
+    if updated:
+        logger.info("Backfilled birthday_ordinal for %s contacts", updated)
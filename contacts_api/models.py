@@ -1,6 +1,16 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
-from database import Base
+from sqlalchemy import Column, Integer, String, ForeignKey, Boolean, Index, Date, DateTime, Text
+from sqlalchemy.orm import relationship, validates
+from contacts_api.database import Base
+from datetime import date, datetime
+from typing import Optional
+
+
+def birthday_ordinal(birthday: Optional[date]) -> Optional[int]:
+    # Day of year in a leap year (1-366), so Feb 29 has its own slot and ordering ignores the birth year.
+    if birthday is None:
+        return None
+    return date(2000, birthday.month, birthday.day).timetuple().tm_yday
+
 
 class Contact(Base):
     __tablename__ = "contacts"
@@ -10,11 +20,22 @@ class Contact(Base):
     last_name = Column(String, index=True)
     email = Column(String, unique=True, index=True)
     phone = Column(String)
-    birthday = Column(String)
+    birthday = Column(Date)
+    birthday_ordinal = Column(Integer, nullable=True)
     additional_info = Column(String)
     user_id = Column(Integer, ForeignKey("users.id")) 
     user = relationship("User", back_populates="contacts")
 
+    __table_args__ = (
+        Index("ix_contacts_user_id_id", "user_id", "id"),
+        Index("ix_contacts_user_id_birthday_ordinal", "user_id", "birthday_ordinal"),
+    )
+
+    @validates("birthday")
+    def set_birthday_ordinal(self, key, value):
+        self.birthday_ordinal = birthday_ordinal(value)
+        return value
+
 
 class User(Base):
     __tablename__ = "users"
@@ -24,4 +45,26 @@ class User(Base):
     email = Column(String, unique=True, index=True)
     password = Column(String)
     is_verified = Column(Boolean, default=False)
+    avatar_url = Column(String, nullable=True)
+    # Bumped by triggers on contacts (see migrations.py) in the same statement as every write; drives ETags and the response cache.
+    contacts_version = Column(Integer, nullable=False, default=0, server_default="0")
     contacts = relationship("Contact", back_populates="user")
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+    last_error = Column(String, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt_at", "status", "next_attempt_at"),
+    )
@@ -0,0 +1,219 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from email.utils import formataddr
+
+import aiosmtplib
+from decouple import config
+from sqlalchemy import func, select, update
+
+from contacts_api.database import async_session_scope
+from contacts_api.email_utils import conf
+from contacts_api.models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_ENABLED = config("OUTBOX_ENABLED", default=True, cast=bool)
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=50, cast=int)
+OUTBOX_POLL_INTERVAL = config("OUTBOX_POLL_INTERVAL", default=2.0, cast=float)
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", default=8, cast=int)
+OUTBOX_BACKOFF_BASE = config("OUTBOX_BACKOFF_BASE", default=5.0, cast=float)
+OUTBOX_BACKOFF_MAX = config("OUTBOX_BACKOFF_MAX", default=3600.0, cast=float)
+# A claimed message whose worker died becomes due again after this long.
+OUTBOX_LEASE_SECONDS = config("OUTBOX_LEASE_SECONDS", default=300, cast=int)
+
+CONNECTION_ERRORS = (
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPAuthenticationError,
+    aiosmtplib.SMTPTimeoutError,
+    OSError,
+)
+
+
+def enqueue_email(db, subject: str, email_to: str, body: str) -> EmailOutbox:
+    # Only adds the row: it is committed together with whatever change triggered the email.
+    message = EmailOutbox(recipient=email_to, subject=subject, body=body)
+    db.add(message)
+    return message
+
+
+def backoff_delay(attempts: int) -> float:
+    return min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** (attempts - 1))
+
+
+class EmailDispatcher:
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE, poll_interval: float = OUTBOX_POLL_INTERVAL):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.sent_total = 0
+        self.retried_total = 0
+        self.failed_total = 0
+        self.queue_depth = 0
+        self.lag_seconds = 0.0
+        self._smtp = None
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def notify(self) -> None:
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._disconnect()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                handled = await self.dispatch_once()
+                await self.refresh_stats()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Email dispatcher cycle failed")
+                handled = 0
+            if handled < self.batch_size:
+                await self._disconnect()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    async def claim_batch(self, db) -> list:
+        now = datetime.utcnow()
+        due = (
+            select(EmailOutbox.id)
+            .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+            .order_by(EmailOutbox.id)
+            .limit(self.batch_size)
+        )
+        result = await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(due), EmailOutbox.next_attempt_at <= now)
+            .values(
+                attempts=EmailOutbox.attempts + 1,
+                next_attempt_at=now + timedelta(seconds=OUTBOX_LEASE_SECONDS),
+            )
+            .returning(EmailOutbox.id, EmailOutbox.recipient, EmailOutbox.subject, EmailOutbox.body, EmailOutbox.attempts)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        await db.commit()
+        return rows
+
+    async def dispatch_once(self) -> int:
+        async with async_session_scope() as db:
+            rows = await self.claim_batch(db)
+            if not rows:
+                return 0
+
+            sent, errors = [], {}
+            for index, row in enumerate(rows):
+                try:
+                    await self._send(row.recipient, row.subject, row.body)
+                    sent.append(row.id)
+                except CONNECTION_ERRORS as e:
+                    # The rest of the batch would fail the same way
+                    for pending in rows[index:]:
+                        errors[pending.id] = (pending.attempts, str(e))
+                    await self._disconnect()
+                    break
+                except aiosmtplib.SMTPException as e:
+                    errors[row.id] = (row.attempts, str(e))
+
+            now = datetime.utcnow()
+            if sent:
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id.in_(sent))
+                    .values(status="sent", sent_at=now, last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for message_id, (attempts, error) in errors.items():
+                if attempts >= OUTBOX_MAX_ATTEMPTS:
+                    values = {"status": "failed", "last_error": error}
+                    self.failed_total += 1
+                    logger.error(f"Giving up on email {message_id} after {attempts} attempts: {error}")
+                else:
+                    values = {"next_attempt_at": now + timedelta(seconds=backoff_delay(attempts)), "last_error": error}
+                    self.retried_total += 1
+                    logger.warning(f"Email {message_id} failed (attempt {attempts}), will retry: {error}")
+                await db.execute(
+                    update(EmailOutbox)
+                    .where(EmailOutbox.id == message_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            await db.commit()
+            self.sent_total += len(sent)
+            return len(rows)
+
+    async def refresh_stats(self) -> None:
+        async with async_session_scope() as db:
+            result = await db.execute(
+                select(func.count(EmailOutbox.id), func.min(EmailOutbox.created_at))
+                .where(EmailOutbox.status == "pending")
+            )
+            depth, oldest = result.one()
+        self.queue_depth = depth
+        self.lag_seconds = (datetime.utcnow() - oldest).total_seconds() if oldest else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "lag_seconds": self.lag_seconds,
+            "sent_total": self.sent_total,
+            "retried_total": self.retried_total,
+            "failed_total": self.failed_total,
+        }
+
+    async def _connect(self):
+        # One SMTP session is kept open while there is a backlog and closed once the queue drains.
+        if self._smtp is None or not self._smtp.is_connected:
+            smtp = aiosmtplib.SMTP(
+                hostname=conf.MAIL_SERVER,
+                port=conf.MAIL_PORT,
+                use_tls=conf.MAIL_SSL_TLS,
+                start_tls=conf.MAIL_STARTTLS,
+                validate_certs=conf.VALIDATE_CERTS,
+                timeout=conf.TIMEOUT,
+            )
+            await smtp.connect()
+            if conf.USE_CREDENTIALS:
+                await smtp.login(conf.MAIL_USERNAME, conf.MAIL_PASSWORD.get_secret_value())
+            self._smtp = smtp
+        return self._smtp
+
+    async def _disconnect(self) -> None:
+        if self._smtp is not None:
+            try:
+                if self._smtp.is_connected:
+                    await self._smtp.quit()
+            except (aiosmtplib.SMTPException, OSError):
+                self._smtp.close()
+            self._smtp = None
+
+    async def _send(self, recipient: str, subject: str, body: str) -> None:
+        message = EmailMessage()
+        message["From"] = formataddr((conf.MAIL_FROM_NAME, conf.MAIL_FROM))
+        message["To"] = recipient
+        message["Subject"] = subject
+        message.set_content(body, subtype="html")
+        smtp = await self._connect()
+        await smtp.send_message(message)
+
+
+email_dispatcher = EmailDispatcher()
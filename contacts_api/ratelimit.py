@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from decouple import config
+
+RATE_LIMIT_ENABLED = config("RATE_LIMIT_ENABLED", default=True, cast=bool)
+RATE_LIMIT_BACKEND = config("RATE_LIMIT_BACKEND", default="memory")
+# Sustained rate in requests per second, burst is the bucket capacity.
+RATE_LIMIT_IP_RATE = config("RATE_LIMIT_IP_RATE", default=1.0, cast=float)
+RATE_LIMIT_IP_BURST = config("RATE_LIMIT_IP_BURST", default=20, cast=int)
+RATE_LIMIT_ACCOUNT_RATE = config("RATE_LIMIT_ACCOUNT_RATE", default=0.05, cast=float)
+RATE_LIMIT_ACCOUNT_BURST = config("RATE_LIMIT_ACCOUNT_BURST", default=5, cast=int)
+RATE_LIMIT_SHARDS = config("RATE_LIMIT_SHARDS", default=16, cast=int)
+RATE_LIMIT_MAX_KEYS_PER_SHARD = config("RATE_LIMIT_MAX_KEYS_PER_SHARD", default=100000, cast=int)
+RATE_LIMIT_MAX_BODY = config("RATE_LIMIT_MAX_BODY", default=16 * 1024, cast=int)
+# Only enable behind exactly one proxy that appends to X-Forwarded-For, otherwise clients can pick their own IP.
+RATE_LIMIT_TRUST_FORWARDED = config("RATE_LIMIT_TRUST_FORWARDED", default=False, cast=bool)
+
+
+class BucketPolicy:
+    def __init__(self, name: str, rate: float, burst: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        # An idle bucket is full again after this long, which is the same as not tracking it at all.
+        self.ttl = burst / rate
+
+
+def refill(tokens: float, updated_at: float, now: float, policy: BucketPolicy) -> float:
+    return min(policy.burst, tokens + (now - updated_at) * policy.rate)
+
+
+def take(tokens: float, policy: BucketPolicy, cost: float) -> Tuple[bool, float, float]:
+    if tokens >= cost:
+        return True, tokens - cost, 0.0
+    return False, tokens, (cost - tokens) / policy.rate
+
+
+class RateLimitBackend(ABC):
+    # Returns (allowed, retry_after_seconds) and charges the bucket when allowed.
+    @abstractmethod
+    async def consume(self, key: str, policy: BucketPolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        ...
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    # Per-process buckets, sharded so concurrent threads rarely share a lock.
+    # Each shard keeps one last-access list per policy. Every bucket in a list has the same TTL,
+    # so expired buckets are always at the front.
+    def __init__(self, shards: int = RATE_LIMIT_SHARDS, max_keys_per_shard: int = RATE_LIMIT_MAX_KEYS_PER_SHARD):
+        self.max_keys_per_shard = max_keys_per_shard
+        self._shards = [(threading.Lock(), {}) for _ in range(shards)]
+
+    async def consume(self, key: str, policy: BucketPolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        return self.consume_sync(key, policy, cost)
+
+    def consume_sync(self, key: str, policy: BucketPolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        lock, lists = self._shards[hash(key) % len(self._shards)]
+        now = time.monotonic()
+        with lock:
+            buckets = lists.setdefault(policy.name, OrderedDict())
+            bucket = buckets.pop(key, None)
+            tokens = policy.burst if bucket is None else refill(bucket[0], bucket[1], now, policy)
+            allowed, tokens, retry_after = take(tokens, policy, cost)
+            buckets[key] = (tokens, now, now + policy.ttl)
+            self._evict(buckets, now)
+        return allowed, retry_after
+
+    def _evict(self, buckets: OrderedDict, now: float) -> None:
+        while buckets:
+            oldest_key, (_, _, expires_at) = next(iter(buckets.items()))
+            if expires_at > now and len(buckets) <= self.max_keys_per_shard:
+                return
+            del buckets[oldest_key]
+
+    def __len__(self) -> int:
+        return sum(len(buckets) for _, lists in self._shards for buckets in lists.values())
+
+
+class SharedStore(ABC):
+    # Minimal key-value contract for sharing buckets across processes (e.g. backed by Redis or memcached).
+    @abstractmethod
+    async def get(self, key: str) -> Optional[tuple]:
+        ...
+
+    @abstractmethod
+    async def compare_and_set(self, key: str, expected: Optional[tuple], value: tuple, ttl: float) -> bool:
+        ...
+
+
+class LocalSharedStore(SharedStore):
+    # In-process stand-in for a shared store, for tests and local development.
+    def __init__(self):
+        self._data = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, key: str) -> Optional[tuple]:
+        item = self._data.get(key)
+        if item is None or item[1] <= time.time():
+            return None
+        return item[0]
+
+    async def compare_and_set(self, key: str, expected: Optional[tuple], value: tuple, ttl: float) -> bool:
+        async with self._lock:
+            if await self.get(key) != expected:
+                return False
+            self._data[key] = (value, time.time() + ttl)
+            return True
+
+
+class SharedRateLimitBackend(RateLimitBackend):
+    def __init__(self, store: SharedStore, max_retries: int = 5):
+        self.store = store
+        self.max_retries = max_retries
+
+    async def consume(self, key: str, policy: BucketPolicy, cost: float = 1.0) -> Tuple[bool, float]:
+        for _ in range(self.max_retries):
+            # Wall-clock time, since the state is shared between hosts
+            now = time.time()
+            current = await self.store.get(key)
+            tokens = policy.burst if current is None else refill(current[0], current[1], now, policy)
+            allowed, tokens, retry_after = take(tokens, policy, cost)
+            if await self.store.compare_and_set(key, current, (tokens, now), policy.ttl):
+                return allowed, retry_after
+        # Heavy contention on one key: fail open rather than lock out a legitimate user
+        return True, 0.0
+
+
+IP_POLICY = BucketPolicy("ip", RATE_LIMIT_IP_RATE, RATE_LIMIT_IP_BURST)
+ACCOUNT_POLICY = BucketPolicy("account", RATE_LIMIT_ACCOUNT_RATE, RATE_LIMIT_ACCOUNT_BURST)
+
+
+class RateLimiter:
+    def __init__(self, backend: RateLimitBackend, ip_policy: BucketPolicy = IP_POLICY, account_policy: BucketPolicy = ACCOUNT_POLICY):
+        self.backend = backend
+        self.ip_policy = ip_policy
+        self.account_policy = account_policy
+        self.allowed = 0
+        self.rejected = {ip_policy.name: 0, account_policy.name: 0}
+
+    async def check(self, route: str, ip: Optional[str], account: Optional[str]) -> Tuple[bool, float]:
+        # The IP bucket goes first so a flood of made-up accounts from one client never reaches the account buckets.
+        checks = [(self.ip_policy, ip), (self.account_policy, account)]
+        for policy, value in checks:
+            if value is None:
+                continue
+            allowed, retry_after = await self.backend.consume(f"{route}:{policy.name}:{value}", policy)
+            if not allowed:
+                self.rejected[policy.name] += 1
+                return False, retry_after
+        self.allowed += 1
+        return True, 0.0
+
+    def stats(self) -> dict:
+        stats = {"allowed": self.allowed}
+        for name, count in self.rejected.items():
+            stats[f"rejected_{name}"] = count
+        if isinstance(self.backend, MemoryRateLimitBackend):
+            stats["buckets"] = len(self.backend)
+        return stats
+
+
+def create_backend(kind: str = RATE_LIMIT_BACKEND) -> RateLimitBackend:
+    if kind == "local-shared":
+        return SharedRateLimitBackend(LocalSharedStore())
+    return MemoryRateLimitBackend()
+
+
+rate_limiter = RateLimiter(create_backend())
@@ -0,0 +1,112 @@
+import re
+from typing import List
+
+from sqlalchemy import inspect, or_, select, text
+
+from contacts_api.database import IS_SQLITE
+from contacts_api.models import Contact
+
+FTS_TABLE = "contacts_fts"
+FTS_SOURCE = "contacts_fts_source"
+
+# External-content FTS5 index over contacts; the triggers keep it in sync with every write path.
+# The owner column holds one "u<user_id>" token per row, so a search only walks its own tenant's
+# doclist instead of ranking every user's matches and filtering afterwards.
+FTS_SCHEMA = [
+    f"""
+    CREATE VIEW IF NOT EXISTS {FTS_SOURCE} AS
+    SELECT id, first_name, last_name, email, 'u' || user_id AS owner FROM contacts
+    """,
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        first_name, last_name, email, owner,
+        content='{FTS_SOURCE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ai AFTER INSERT ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, email, owner)
+        VALUES (new.id, new.first_name, new.last_name, new.email, 'u' || new.user_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_ad AFTER DELETE ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, email, owner)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, 'u' || old.user_id);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS contacts_fts_au AFTER UPDATE OF first_name, last_name, email, user_id ON contacts BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, first_name, last_name, email, owner)
+        VALUES ('delete', old.id, old.first_name, old.last_name, old.email, 'u' || old.user_id);
+        INSERT INTO {FTS_TABLE}(rowid, first_name, last_name, email, owner)
+        VALUES (new.id, new.first_name, new.last_name, new.email, 'u' || new.user_id);
+    END
+    """,
+]
+FTS_TRIGGERS = ["contacts_fts_ai", "contacts_fts_ad", "contacts_fts_au"]
+
+# bm25 column weights: names rank above email matches; the owner column never adds to the score.
+FTS_QUERY = text(f"""
+    SELECT contacts.* FROM {FTS_TABLE}
+    JOIN contacts ON contacts.id = {FTS_TABLE}.rowid
+    WHERE {FTS_TABLE} MATCH :match AND contacts.user_id = :user_id
+    ORDER BY bm25({FTS_TABLE}, 10.0, 10.0, 5.0, 0.0)
+    LIMIT :limit
+""")
+
+
+def init_search_index(engine) -> None:
+    if not IS_SQLITE:
+        return
+    created = not inspect(engine).has_table(FTS_TABLE)
+    with engine.begin() as connection:
+        if not created:
+            existing = connection.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)
+            ).scalar()
+            if "owner" not in existing:
+                # Index from before the owner column: drop it and its triggers, then rebuild below
+                for trigger in FTS_TRIGGERS:
+                    connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+                connection.exec_driver_sql(f"DROP TABLE {FTS_TABLE}")
+                created = True
+        for statement in FTS_SCHEMA:
+            connection.exec_driver_sql(statement)
+        if created:
+            # Index rows written before the FTS table existed
+            connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+
+
+def build_match_expression(q: str, user_id: int) -> str:
+    # Quote every token so user input can't inject FTS syntax; the trailing * makes each a prefix match.
+    tokens = re.findall(r"\w+", q.lower())
+    if not tokens:
+        return ""
+    terms = " ".join(f'"{token}"*' for token in tokens)
+    return f'owner : "u{user_id}" AND {{first_name last_name email}} : ({terms})'
+
+
+async def search_user_contacts(db, user_id: int, q: str, limit: int) -> List[Contact]:
+    if not IS_SQLITE:
+        return await search_user_contacts_ilike(db, user_id, q, limit)
+    match = build_match_expression(q, user_id)
+    if not match:
+        return []
+    statement = select(Contact).from_statement(FTS_QUERY.bindparams(match=match, user_id=user_id, limit=limit))
+    result = await db.execute(statement)
+    return result.scalars().all()
+
+
+async def search_user_contacts_ilike(db, user_id: int, q: str, limit: int) -> List[Contact]:
+    query = select(Contact).where(Contact.user_id == user_id)
+    for token in q.split():
+        pattern = f"%{token}%"
+        query = query.where(or_(
+            Contact.first_name.ilike(pattern),
+            Contact.last_name.ilike(pattern),
+            Contact.email.ilike(pattern),
+        ))
+    result = await db.execute(query.order_by(Contact.id).limit(limit))
+    return result.scalars().all()
@@ -1,9 +1,97 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from decouple import config
+from fastapi import HTTPException
 from passlib.context import CryptContext
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+BCRYPT_ROUNDS = config("BCRYPT_ROUNDS", default=12, cast=int)
+HASH_EXECUTOR = config("HASH_EXECUTOR", default="thread")
+HASH_WORKERS = config("HASH_WORKERS", default=4, cast=int)
+HASH_MAX_PENDING = config("HASH_MAX_PENDING", default=64, cast=int)
+
+# min/max rounds pin the cost so verify_and_update flags hashes made with an older setting.
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class LazyPoolExecutor(Executor):
+    # Starts the pool on first use and again after shutdown(), so the app can be started more than once per process.
+    def __init__(self, kind: str, workers: int, thread_name_prefix: str = ""):
+        self.kind = kind
+        self.workers = workers
+        self.thread_name_prefix = thread_name_prefix
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pool is None:
+                if self.kind == "process":
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=self.thread_name_prefix)
+            return self._pool.submit(fn, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait, cancel_futures=cancel_futures)
+                self._pool = None
+
+
+class HashingService:
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING, executor: str = HASH_EXECUTOR):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self.executor = LazyPoolExecutor(executor, workers, thread_name_prefix="hashing")
+
+    async def _run(self, func, *args):
+        if self.workers <= 0:
+            return func(*args)
+        # Only touched from the event loop thread, so a plain counter is enough.
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy, please try again later",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {"pending": self.pending, "rejected": self.rejected}
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False)
+
+
+hashing_service = HashingService()
@@ -0,0 +1,91 @@
+import asyncio
+import json
+
+import pytest
+
+from contacts_api import middleware
+from contacts_api.middleware import RateLimitMiddleware
+from contacts_api.ratelimit import (
+    RATE_LIMIT_MAX_BODY, BucketPolicy, LocalSharedStore, MemoryRateLimitBackend, RateLimitBackend, RateLimiter,
+    SharedRateLimitBackend, SharedStore,
+)
+
+LOGIN = "/auth/login"
+ACCOUNT_BURST = 5
+
+
+@pytest.fixture(params=["memory", "local-shared"])
+def limiter(request, monkeypatch):
+    monkeypatch.setattr(middleware, "RATE_LIMIT_ENABLED", True)
+    backend = MemoryRateLimitBackend() if request.param == "memory" else SharedRateLimitBackend(LocalSharedStore())
+    return RateLimiter(
+        backend,
+        ip_policy=BucketPolicy("ip", 1.0, 100),
+        account_policy=BucketPolicy("account", 0.01, ACCOUNT_BURST),
+    )
+
+
+class App:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, scope, receive, send):
+        self.calls += 1
+        while (await receive()).get("more_body"):
+            pass
+        await send({"type": "http.response.start", "status": 401, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def post(rate_limited, ip: str, chunks: list) -> int:
+    scope = {"type": "http", "method": "POST", "path": LOGIN, "headers": [], "client": (ip, 50000)}
+    messages = [
+        {"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)
+    ]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(rate_limited(scope, receive, send))
+    return sent[0]["status"]
+
+
+def login_body(padding: int = 0) -> bytes:
+    return json.dumps({"email": "victim@example.com", "password": "guess", "pad": "x" * padding}).encode()
+
+
+def test_account_bucket_applies_across_ips(limiter):
+    app = App()
+    rate_limited = RateLimitMiddleware(app, limiter, {LOGIN})
+    statuses = [post(rate_limited, f"10.0.0.{i}", [login_body()]) for i in range(ACCOUNT_BURST + 3)]
+    assert statuses == [401] * ACCOUNT_BURST + [429] * 3
+    assert app.calls == ACCOUNT_BURST
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_oversized_body_fails_closed(limiter, chunked):
+    app = App()
+    rate_limited = RateLimitMiddleware(app, limiter, {LOGIN})
+    body = login_body(RATE_LIMIT_MAX_BODY)
+    chunks = [body[i:i + 4096] for i in range(0, len(body), 4096)] if chunked else [body]
+    statuses = [post(rate_limited, f"10.0.0.{i}", chunks) for i in range(ACCOUNT_BURST + 3)]
+    assert statuses == [413] * (ACCOUNT_BURST + 3)
+    assert app.calls == 0
+
+
+def test_backends_must_implement_the_interface():
+    class Backend(RateLimitBackend):
+        pass
+
+    class Store(SharedStore):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Backend()
+    with pytest.raises(TypeError):
+        Store()